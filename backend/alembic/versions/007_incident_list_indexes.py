@@ -0,0 +1,41 @@
+"""add composite and open-status partial indexes for incident lists
+
+Revision ID: 007
+Revises: 006
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "007"
+down_revision = "006"
+
+OPEN_STATUSES = "status IN ('new', 'in_progress', 'awaiting_soc', 'awaiting_customer')"
+
+
+def upgrade():
+    # CONCURRENTLY can't run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        # list_incidents: WHERE tenant_id = ? [AND status = ?] ORDER BY published_at DESC
+        op.create_index(
+            "ix_incidents_list",
+            "published_incidents",
+            ["tenant_id", "status", sa.text("published_at DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        # Dashboards showing open incidents per tenant
+        op.create_index(
+            "ix_incidents_open",
+            "published_incidents",
+            ["tenant_id", sa.text("published_at DESC")],
+            postgresql_where=sa.text(OPEN_STATUSES),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_incidents_open", "published_incidents", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("ix_incidents_list", "published_incidents", postgresql_concurrently=True, if_exists=True)
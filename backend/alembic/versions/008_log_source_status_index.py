@@ -0,0 +1,23 @@
+"""add log_sources (tenant_id, is_active, status) index
+
+Revision ID: 008
+Revises: 007
+"""
+
+from alembic import op
+
+revision = "008"
+down_revision = "007"
+
+
+def upgrade():
+    # get_stats: WHERE tenant_id = ? AND is_active GROUP BY status
+    op.create_index(
+        "ix_logsource_tenant_active_status",
+        "log_sources",
+        ["tenant_id", "is_active", "status"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_logsource_tenant_active_status", "log_sources")
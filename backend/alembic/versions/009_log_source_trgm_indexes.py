@@ -0,0 +1,30 @@
+"""add pg_trgm GIN indexes for log source search
+
+Revision ID: 009
+Revises: 008
+"""
+
+from alembic import op
+
+revision = "009"
+down_revision = "008"
+
+SEARCH_COLUMNS = ("name", "host", "vendor", "product")
+
+
+def upgrade():
+    # Lets the planner use an index for ILIKE '%search%' in source lists
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in SEARCH_COLUMNS:
+        op.create_index(
+            f"ix_logsource_{column}_trgm",
+            "log_sources",
+            [column],
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        )
+
+
+def downgrade():
+    for column in SEARCH_COLUMNS:
+        op.drop_index(f"ix_logsource_{column}_trgm", "log_sources")
@@ -0,0 +1,43 @@
+"""add unique (tenant_id, host) index on active log sources
+
+Revision ID: 010
+Revises: 009
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "010"
+down_revision = "009"
+
+
+def upgrade():
+    # Earlier check-then-insert create() could race and update_source() never
+    # checked hosts, so duplicates may exist: keep the oldest active row per
+    # (tenant_id, host) and soft-delete the rest, as delete_source() would.
+    op.execute("""
+        UPDATE log_sources SET is_active = false, updated_at = now()
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY tenant_id, host ORDER BY created_at, id
+                ) AS rn
+                FROM log_sources
+                WHERE is_active
+            ) ranked
+            WHERE rn > 1
+        )
+    """)
+
+    # Target of LogSourceService.create()'s ON CONFLICT DO NOTHING
+    op.create_index(
+        "uq_logsource_tenant_host_active",
+        "log_sources",
+        ["tenant_id", "host"],
+        unique=True,
+        postgresql_where=sa.text("is_active"),
+    )
+
+
+def downgrade():
+    op.drop_index("uq_logsource_tenant_host_active", "log_sources")
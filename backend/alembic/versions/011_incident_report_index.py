@@ -0,0 +1,34 @@
+"""add tenant/published_at index for report period scans
+
+Revision ID: 011
+Revises: 010
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "011"
+down_revision = "010"
+
+
+def upgrade():
+    # CONCURRENTLY can't run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        # Monthly/SLA reports and CSV export: WHERE tenant_id = ? AND
+        # published_at BETWEEN ? AND ? ORDER BY published_at DESC, any status.
+        # ix_incidents_list leads with status, so it can't serve the range.
+        op.create_index(
+            "ix_incidents_tenant_published",
+            "published_incidents",
+            ["tenant_id", sa.text("published_at DESC")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_incidents_tenant_published", "published_incidents",
+            postgresql_concurrently=True, if_exists=True,
+        )
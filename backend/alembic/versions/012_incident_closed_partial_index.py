@@ -0,0 +1,35 @@
+"""add partial tenant/published_at index over closed incidents
+
+Revision ID: 012
+Revises: 011
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "012"
+down_revision = "011"
+
+
+def upgrade():
+    # CONCURRENTLY can't run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        # Daily SLA snapshot: WHERE tenant_id = ? AND published_at >= ?
+        # AND status IN ('closed', 'resolved'). The worker inlines the
+        # statuses so this predicate matches under generic plans too.
+        op.create_index(
+            "ix_incidents_tenant_closed",
+            "published_incidents",
+            ["tenant_id", sa.text("published_at DESC")],
+            postgresql_where=sa.text("status IN ('closed', 'resolved')"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_incidents_tenant_closed", "published_incidents",
+            postgresql_concurrently=True, if_exists=True,
+        )
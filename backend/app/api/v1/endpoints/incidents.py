@@ -9,9 +9,13 @@ Tenant ID comes from JWT automatically.
 /api/incidents/{id}/comments — add comment
 /api/incidents/{id}/status   — change status
 /api/incidents/{id}/response — update client response text
+/api/incidents/acknowledge   — acknowledge several incidents
 """
 
+import uuid
+
 from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -36,6 +40,10 @@ class ChangeStatusRequest(BaseModel):
     comment: str | None = None
 
 
+class BulkAcknowledgeRequest(BaseModel):
+    incident_ids: list[uuid.UUID]
+
+
 class ClientResponseRequest(BaseModel):
     client_response: str
 
@@ -58,7 +66,7 @@ async def list_incidents(
         raise HTTPException(status_code=403, detail="No tenant assigned")
 
     service = IncidentService(db)
-    return await service.list_incidents(
+    return ORJSONResponse(await service.list_incidents(
         tenant_id=user.tenant_id,
         status=status,
         priority=priority,
@@ -66,7 +74,7 @@ async def list_incidents(
         date_to=date_to,
         page=page,
         per_page=per_page,
-    )
+    ))
 
 
 # ── Incident detail ──────────────────────────────────────────────
@@ -83,7 +91,7 @@ async def get_incident(
 
     service = IncidentService(db)
     try:
-        return await service.get_incident_detail(incident_id, tenant_id=user.tenant_id)
+        return await service.get_incident_detail(incident_id, tenant_id=uuid.UUID(user.tenant_id))
     except IncidentServiceError as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
 
@@ -108,10 +116,11 @@ async def add_comment(
     try:
         comment = await service.add_comment(
             incident_id=incident_id,
-            user_id=user.user_id,
+            user_id=uuid.UUID(user.user_id),
             text=body.text,
             is_soc=False,
-            tenant_id=user.tenant_id,
+            tenant_id=uuid.UUID(user.tenant_id),
+            user_name=user.name,
         )
     except IncidentServiceError as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
@@ -145,10 +154,11 @@ async def change_status(
         incident = await service.change_status(
             incident_id=incident_id,
             new_status=body.status,
-            user_id=user.user_id,
+            user_id=uuid.UUID(user.user_id),
             is_soc=False,
             comment=body.comment,
-            tenant_id=user.tenant_id,
+            tenant_id=uuid.UUID(user.tenant_id),
+            user_name=user.name,
         )
     except IncidentServiceError as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
@@ -174,7 +184,7 @@ async def update_response(
         await service.update_client_response(
             incident_id=incident_id,
             client_response=body.client_response,
-            tenant_id=user.tenant_id,
+            tenant_id=uuid.UUID(user.tenant_id),
         )
     except IncidentServiceError as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
@@ -199,10 +209,31 @@ async def acknowledge_incident(
     try:
         result = await service.acknowledge_incident(
             incident_id=incident_id,
-            user_id=user.user_id,
-            tenant_id=tenant_id,
+            user_id=uuid.UUID(user.user_id),
+            tenant_id=uuid.UUID(tenant_id),
         )
     except IncidentServiceError as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
 
     return result
+
+
+@router.put("/acknowledge")
+async def bulk_acknowledge_incidents(
+    body: BulkAcknowledgeRequest,
+    user: CurrentUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Client acknowledges several incidents at once."""
+    tenant_id = user.tenant_id
+    if not tenant_id:
+        raise HTTPException(status_code=403, detail="No tenant assigned")
+    if not body.incident_ids:
+        raise HTTPException(status_code=400, detail="Не выбраны инциденты")
+
+    service = IncidentService(db)
+    return await service.bulk_acknowledge(
+        incident_ids=body.incident_ids,
+        user_id=uuid.UUID(user.user_id),
+        tenant_id=uuid.UUID(tenant_id),
+    )
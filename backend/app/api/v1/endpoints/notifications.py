@@ -48,14 +48,14 @@ async def list_notifications(
     if not user.tenant_id:
         return {"items": [], "total": 0}
 
-    query = select(Notification).where(Notification.tenant_id == user.tenant_id)
+    filters = [Notification.tenant_id == user.tenant_id]
     if read is not None:
-        query = query.where(Notification.is_read == read)
+        filters.append(Notification.is_read == read)
 
-    count_q = select(func.count()).select_from(query.subquery())
+    count_q = select(func.count(Notification.id)).where(*filters)
     total = (await db.execute(count_q)).scalar() or 0
 
-    query = query.order_by(Notification.created_at.desc())
+    query = select(Notification).where(*filters).order_by(Notification.created_at.desc())
     query = query.offset((page - 1) * per_page).limit(per_page)
     result = await db.execute(query)
     notifs = result.scalars().all()
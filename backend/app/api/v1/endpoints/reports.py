@@ -9,17 +9,20 @@ Reports endpoints.
 
 import csv
 import io
-from datetime import datetime, timezone
+import os
+import tempfile
 
+import redis.asyncio as aioredis
 from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import Response
+from fastapi.responses import FileResponse, Response
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
 
-from app.core.dependencies import get_db
+from app.core.dependencies import get_db, get_redis_bytes
 from app.core.security import CurrentUser, get_current_user
 from app.models.models import PublishedIncident
-from app.services.report_service import ReportService, ReportServiceError
+from app.services.report_service import ReportService, ReportServiceError, parse_period
 
 router = APIRouter()
 
@@ -31,6 +34,23 @@ def _resolve_tenant(user: CurrentUser, tenant_id: str | None) -> str | None:
     return user.tenant_id
 
 
+def _pdf_tempfile() -> str:
+    """Path the render worker writes the PDF to; removed after sending."""
+    fd, path = tempfile.mkstemp(prefix="report_", suffix=".pdf")
+    os.close(fd)
+    return path
+
+
+def _pdf_file_response(path: str, filename: str) -> FileResponse:
+    """Stream a rendered PDF from disk in chunks, then delete it."""
+    return FileResponse(
+        path,
+        media_type="application/pdf",
+        filename=filename,
+        background=BackgroundTask(os.unlink, path),
+    )
+
+
 @router.get("/monthly")
 async def monthly_report(
     period_from: str = Query(..., description="Start date YYYY-MM-DD"),
@@ -38,13 +58,14 @@ async def monthly_report(
     tenant_id: str | None = Query(None),
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis_bytes),
 ):
     """Generate and download monthly SOC report PDF."""
     tid = _resolve_tenant(user, tenant_id)
     if not tid:
         raise HTTPException(status_code=400, detail="Выберите клиента")
 
-    service = ReportService(db)
+    service = ReportService(db, redis_client=redis_client)
     try:
         pdf_bytes = await service.generate_monthly_report(
             tid, period_from, period_to
@@ -67,26 +88,25 @@ async def sla_report_pdf(
     tenant_id: str | None = Query(None),
     user: CurrentUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis_bytes),
 ):
     """Generate SLA report PDF with metrics and trends."""
     tid = _resolve_tenant(user, tenant_id)
     if not tid:
         raise HTTPException(status_code=400, detail="Выберите клиента")
 
-    service = ReportService(db)
+    service = ReportService(db, redis_client=redis_client)
+    path = _pdf_tempfile()
     try:
-        pdf_bytes = await service.generate_sla_report(
-            tid, period_from, period_to
-        )
+        await service.generate_sla_report(tid, period_from, period_to, out=path)
     except ReportServiceError as e:
+        os.unlink(path)
         raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception:
+        os.unlink(path)
+        raise
 
-    filename = f"sla_report_{period_from}_{period_to}.pdf"
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return _pdf_file_response(path, f"sla_report_{period_from}_{period_to}.pdf")
 
 
 @router.get("/csv")
@@ -103,12 +123,9 @@ async def incidents_csv(
         raise HTTPException(status_code=400, detail="Выберите клиента")
 
     try:
-        dt_from = datetime.fromisoformat(period_from).replace(tzinfo=timezone.utc)
-        dt_to = datetime.fromisoformat(period_to).replace(
-            hour=23, minute=59, second=59, tzinfo=timezone.utc
-        )
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Неверный формат даты")
+        dt_from, dt_to = parse_period(period_from, period_to)
+    except ReportServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
     result = await db.execute(
         select(PublishedIncident)
@@ -165,14 +182,14 @@ async def incident_report(
         raise HTTPException(status_code=400, detail="Выберите клиента")
 
     service = ReportService(db)
+    path = _pdf_tempfile()
     try:
-        pdf_bytes = await service.generate_incident_report(tid, incident_id)
+        await service.generate_incident_report(tid, incident_id, out=path)
     except ReportServiceError as e:
+        os.unlink(path)
         raise HTTPException(status_code=e.status_code, detail=e.detail)
+    except Exception:
+        os.unlink(path)
+        raise
 
-    filename = f"incident_{incident_id[:8]}.pdf"
-    return Response(
-        content=pdf_bytes,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
-    )
+    return _pdf_file_response(path, f"incident_{incident_id[:8]}.pdf")
@@ -11,14 +11,16 @@ SOC Operator endpoints — real implementation.
 """
 
 import logging
+import uuid
 
 import redis.asyncio as aioredis
 from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, EmailStr
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_db, get_redis
+from app.core.dependencies import get_db, get_redis, get_rusiem_http
 from app.core.security import CurrentUser, RoleRequired
 from app.integrations.rusiem.client import RuSIEMClient
 from app.core.config import get_settings
@@ -38,7 +40,7 @@ admin_only = RoleRequired("soc_admin")
 
 class PublishIncidentRequest(BaseModel):
     rusiem_incident_id: int
-    tenant_id: str
+    tenant_id: uuid.UUID
     recommendations: str
     soc_actions: str | None = None
     incident_type: str | None = None
@@ -55,6 +57,12 @@ class AddCommentRequest(BaseModel):
     text: str
 
 
+class BulkIocAssetsRequest(BaseModel):
+    incident_ids: list[uuid.UUID]
+    ioc_indicators: list | None = None
+    affected_assets: list | None = None
+
+
 class CreateUserRequest(BaseModel):
     email: EmailStr
     name: str
@@ -101,6 +109,7 @@ async def _get_rusiem(redis_client: aioredis.Redis) -> RuSIEMClient:
         api_key=settings.RUSIEM_API_KEY,
         redis_client=redis_client,
         verify_ssl=settings.RUSIEM_VERIFY_SSL,
+        http=get_rusiem_http(),
     )
 
 
@@ -350,7 +359,7 @@ async def publish_incident(
             tenant_id=body.tenant_id,
             recommendations=body.recommendations,
             soc_actions=body.soc_actions,
-            published_by_id=user.user_id,
+            published_by_id=uuid.UUID(user.user_id),
             incident_type=body.incident_type,
         )
     except IncidentServiceError as e:
@@ -383,11 +392,11 @@ async def list_all_incidents(
 ):
     """List all published incidents. SOC sees all tenants."""
     service = IncidentService(db)
-    return await service.list_incidents(
+    return ORJSONResponse(await service.list_incidents(
         tenant_id=tenant_id, status=status, priority=priority,
         date_from=date_from, date_to=date_to,
         page=page, per_page=per_page,
-    )
+    ))
 
 
 # ── Get Incident Detail ──────────────────────────────────────────
@@ -418,7 +427,7 @@ async def update_incident(
     """Update recommendations or SOC actions."""
     service = IncidentService(db)
     try:
-        incident = await service.update_soc_fields(
+        updated_id = await service.update_soc_fields(
             incident_id,
             recommendations=body.recommendations,
             soc_actions=body.soc_actions,
@@ -429,7 +438,7 @@ async def update_incident(
     except IncidentServiceError as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-    return {"ok": True, "id": str(incident.id)}
+    return {"ok": True, "id": str(updated_id)}
 
 
 # ── SOC Comment ───────────────────────────────────────────────────
@@ -446,9 +455,10 @@ async def add_soc_comment(
     try:
         comment = await service.add_comment(
             incident_id=incident_id,
-            user_id=user.user_id,
+            user_id=uuid.UUID(user.user_id),
             text=body.text,
             is_soc=True,
+            user_name=user.name,
         )
     except IncidentServiceError as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
@@ -472,9 +482,10 @@ async def change_status_soc(
         incident = await service.change_status(
             incident_id=incident_id,
             new_status=new_status,
-            user_id=user.user_id,
+            user_id=uuid.UUID(user.user_id),
             is_soc=True,
             comment=comment,
+            user_name=user.name,
         )
     except IncidentServiceError as e:
         raise HTTPException(status_code=e.status_code, detail=e.detail)
@@ -502,6 +513,22 @@ async def update_ioc_assets(
     return {"ok": True}
 
 
+@router.post("/incidents/ioc-assets")
+async def bulk_update_ioc_assets(
+    body: BulkIocAssetsRequest,
+    user: CurrentUser = Depends(soc_only),
+    db: AsyncSession = Depends(get_db),
+):
+    """Apply the same IOC indicators / affected assets to several incidents (SOC only)."""
+    service = IncidentService(db)
+    return await service.bulk_update_ioc_assets(
+        incident_ids=body.incident_ids,
+        user_id=uuid.UUID(user.user_id),
+        ioc_indicators=body.ioc_indicators,
+        affected_assets=body.affected_assets,
+    )
+
+
 # ══════════════════════════════════════════════════════════════════
 # User Management (SOC Admin)
 # ══════════════════════════════════════════════════════════════════
@@ -544,7 +571,10 @@ async def list_users(
 ):
     """List all users."""
     service = UserService(db)
-    return await service.list_users(tenant_id=tenant_id, role=role, page=page)
+    try:
+        return await service.list_users(tenant_id=tenant_id, role=role, page=page)
+    except UserServiceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
 
 @router.delete("/users/{user_id}")
@@ -629,25 +659,29 @@ async def list_all_sources(
     search: str | None = Query(None),
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=100),
+    after_name: str | None = Query(None, description="Курсор: name последней записи предыдущей страницы"),
+    after_id: uuid.UUID | None = Query(None, description="Курсор: id последней записи предыдущей страницы"),
     user: CurrentUser = Depends(soc_only),
     db: AsyncSession = Depends(get_db),
 ):
     """List all log sources across tenants (SOC view)."""
     service = LogSourceService(db)
-    return await service.list_all(
+    return ORJSONResponse(await service.list_all(
         tenant_id=tenant_id, status=status, search=search,
         page=page, per_page=per_page,
-    )
+        after_name=after_name, after_id=after_id,
+    ))
 
 
 @router.post("/sources")
 async def create_source(
     body: CreateSourceRequest,
     user: CurrentUser = Depends(soc_only),
+    redis_client: aioredis.Redis = Depends(get_redis),
     db: AsyncSession = Depends(get_db),
 ):
     """Add a new log source to a client's organization."""
-    service = LogSourceService(db)
+    service = LogSourceService(db, redis_client)
     try:
         source = await service.create(
             tenant_id=body.tenant_id,
@@ -693,10 +727,11 @@ async def update_source(
 async def delete_source(
     source_id: str = Path(...),
     user: CurrentUser = Depends(soc_only),
+    redis_client: aioredis.Redis = Depends(get_redis),
     db: AsyncSession = Depends(get_db),
 ):
     """Soft-delete a log source."""
-    service = LogSourceService(db)
+    service = LogSourceService(db, redis_client)
     try:
         return await service.delete_source(source_id)
     except LogSourceServiceError as e:
@@ -715,11 +750,10 @@ async def trigger_source_sync(
     Queries RuSIEM for recent events per source host, updates statuses.
     """
     from app.services.log_source_service import LogSourceService
-    from app.models.models import Tenant, LogSource
-    from datetime import datetime, timezone
+    from app.models.models import Tenant
 
     rusiem = await _get_rusiem(redis_client)
-    service = LogSourceService(db)
+    service = LogSourceService(db, redis_client)
     results = []
 
     try:
@@ -733,46 +767,18 @@ async def trigger_source_sync(
 
         for tenant in tenants:
             # Get all active sources for this tenant
-            sources = (await db.execute(
-                select(LogSource).where(
-                    LogSource.tenant_id == tenant.id,
-                    LogSource.is_active == True,  # noqa: E712
-                )
-            )).scalars().all()
+            sources = await service.load_hosts(tenant.id)
 
             if not sources:
                 continue
 
-            source_events: dict[str, datetime | None] = {}
-
-            for source in sources:
-                try:
-                    # Search recent events from this source host in RuSIEM
-                    events = await rusiem.search_events(
-                        query=f"host:{source.host}",
-                        interval="5m",
-                        limit=1,
-                    )
-                    event_data = events.get("data", [])
-                    if event_data and len(event_data) > 0:
-                        # Get timestamp of most recent event
-                        ts = event_data[0].get("timestamp") or event_data[0].get("@timestamp")
-                        if ts:
-                            if isinstance(ts, str):
-                                last_dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                            else:
-                                last_dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
-                            source_events[source.host] = last_dt
-                        else:
-                            source_events[source.host] = None
-                    else:
-                        source_events[source.host] = None
-                except Exception as e:
-                    logger.warning(f"Failed to check source {source.host}: {e}")
-                    source_events[source.host] = None
+            # Search recent events from each source host in RuSIEM
+            source_events = await service.probe_last_events(
+                rusiem, [source.host for source in sources]
+            )
 
             updated = await service.update_statuses_for_tenant(
-                str(tenant.id), source_events
+                str(tenant.id), source_events, sources
             )
             results.append({
                 "tenant": tenant.short_name,
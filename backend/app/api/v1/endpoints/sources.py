@@ -6,10 +6,12 @@ Log sources endpoints — client view.
 /api/sources/types     — distinct source types (for filter dropdown)
 """
 
+import redis.asyncio as aioredis
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.dependencies import get_db
+from app.core.dependencies import get_db, get_redis
 from app.core.security import CurrentUser, RoleRequired
 from app.services.log_source_service import LogSourceService
 
@@ -33,24 +35,25 @@ async def list_sources(
         raise HTTPException(status_code=403, detail="Нет привязки к организации")
 
     service = LogSourceService(db)
-    return await service.list_for_tenant(
+    return ORJSONResponse(await service.list_for_tenant(
         tenant_id=str(user.tenant_id),
         status=status,
         search=search,
         source_type=source_type,
-    )
+    ))
 
 
 @router.get("/stats")
 async def source_stats(
     user: CurrentUser = Depends(client_viewer),
     db: AsyncSession = Depends(get_db),
+    redis_client: aioredis.Redis = Depends(get_redis),
 ):
     """Source status statistics for the client dashboard widget."""
     if not user.tenant_id:
         raise HTTPException(status_code=403, detail="Нет привязки к организации")
 
-    service = LogSourceService(db)
+    service = LogSourceService(db, redis_client)
     return await service.get_stats(str(user.tenant_id))
 
 
@@ -12,6 +12,9 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "postgresql+asyncpg://portal:portal_secret@db:5432/mssp_portal"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE: int = 1800  # seconds
 
     # Redis
     REDIS_URL: str = "redis://redis:6379/0"
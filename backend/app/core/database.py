@@ -1,17 +1,36 @@
+import asyncio
+import inspect
+import logging
+from collections.abc import Callable
+
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy import text
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy import event, text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _json_serializer(value) -> str:
+    """Encode JSON/JSONB bind values (raw RuSIEM payloads, notification and
+    audit details) with orjson instead of the stdlib encoder."""
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+
 
 engine = create_async_engine(
     settings.DATABASE_URL,
     echo=settings.APP_DEBUG,
-    pool_size=20,
-    max_overflow=10,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
     pool_pre_ping=True,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
 )
 
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
@@ -22,6 +41,66 @@ class Base(DeclarativeBase):
     pass
 
 
+# ── Post-commit side-effects ──────────────────────────────────────
+
+def after_commit(session: AsyncSession, callback: Callable[[], object]) -> None:
+    """Run ``callback`` once the session's current transaction commits.
+
+    Used for side-effects such as Celery email tasks and audit rows, which
+    must not fire for a write that is later rolled back. Discarded on
+    rollback. Coroutine functions are scheduled as tasks on the running loop.
+    """
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+def _call_logged(callback: Callable[[], object]) -> None:
+    try:
+        callback()
+    except Exception as e:
+        logger.warning(f"Post-commit callback failed: {e}")
+
+
+# Strong refs to in-flight post-commit tasks; the loop only keeps weak ones.
+_background_tasks: set[asyncio.Task] = set()
+
+
+async def _await_logged(callback: Callable[[], object]) -> None:
+    try:
+        await callback()
+    except Exception as e:
+        logger.warning(f"Post-commit callback failed: {e}")
+
+
+@event.listens_for(Session, "after_commit")
+def _run_after_commit(session: Session) -> None:
+    callbacks = session.info.pop("after_commit", [])
+    if not callbacks:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+    for callback in callbacks:
+        if inspect.iscoroutinefunction(callback):
+            if loop is None:
+                asyncio.run(_await_logged(callback))
+            else:
+                task = loop.create_task(_await_logged(callback))
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+        elif loop is None:
+            _call_logged(callback)
+        else:
+            # Broker round-trips (Celery .delay) shouldn't hold up the
+            # event loop or the response of the request that committed.
+            loop.run_in_executor(None, _call_logged, callback)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_after_commit(session: Session) -> None:
+    session.info.pop("after_commit", None)
+
+
 async def get_db() -> AsyncSession:
     """Dependency: yields a database session."""
     async with AsyncSessionLocal() as session:
@@ -44,6 +123,17 @@ async def set_tenant_context(session: AsyncSession, tenant_id: str) -> None:
     await session.execute(text(f"SET app.current_tenant = '{tenant_id}'"))
 
 
+def pool_stats() -> dict:
+    """Connection pool counters of the API engine, for health checks."""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+
+
 def create_celery_session():
     """Create a fresh engine + session for Celery tasks (separate event loop)."""
     from sqlalchemy.pool import NullPool
@@ -51,6 +141,8 @@ def create_celery_session():
         settings.DATABASE_URL,
         echo=False,
         poolclass=NullPool,
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads,
     )
     _session_factory = async_sessionmaker(_engine, class_=AsyncSession, expire_on_commit=False)
     return _engine, _session_factory
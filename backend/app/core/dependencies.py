@@ -6,6 +6,7 @@ Provides: database sessions, Redis client, RuSIEM client, current user with tena
 
 from typing import AsyncGenerator
 
+import httpx
 import redis.asyncio as aioredis
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -33,6 +34,30 @@ async def get_redis() -> aioredis.Redis:
     return _redis_pool
 
 
+_redis_bytes_pool: aioredis.Redis | None = None
+
+
+async def get_redis_bytes() -> aioredis.Redis:
+    """Redis client returning raw bytes, for binary cache values (PDFs)."""
+    global _redis_bytes_pool
+    if _redis_bytes_pool is None:
+        _redis_bytes_pool = aioredis.from_url(settings.REDIS_URL, max_connections=10)
+    return _redis_bytes_pool
+
+
+# ── RuSIEM HTTP pool singleton ───────────────────────────────────
+
+_rusiem_http: httpx.AsyncClient | None = None
+
+
+def get_rusiem_http() -> httpx.AsyncClient:
+    """Keep-alive connection pool for the default RuSIEM instance."""
+    global _rusiem_http
+    if _rusiem_http is None:
+        _rusiem_http = RuSIEMClient.make_http(settings.RUSIEM_API_URL, settings.RUSIEM_VERIFY_SSL)
+    return _rusiem_http
+
+
 # ── Database session ──────────────────────────────────────────────
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
@@ -85,6 +110,7 @@ async def get_rusiem_client(
         api_key=settings.RUSIEM_API_KEY,
         redis_client=redis_client,
         verify_ssl=settings.RUSIEM_VERIFY_SSL,
+        http=get_rusiem_http(),
     )
     return client
 
@@ -101,4 +127,5 @@ async def get_rusiem_for_tenant(
         api_key=settings.RUSIEM_API_KEY,
         redis_client=redis_client,
         verify_ssl=settings.RUSIEM_VERIFY_SSL,
+        http=get_rusiem_http(),
     )
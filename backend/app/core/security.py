@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
@@ -23,6 +24,17 @@ def verify_password(plain: str, hashed: str) -> bool:
     return bcrypt.checkpw(plain.encode(), hashed.encode())
 
 
+# bcrypt is CPU-bound (hundreds of ms per call); request handlers use these
+# so the work runs in a thread instead of stalling the event loop.
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.to_thread(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await asyncio.to_thread(verify_password, plain, hashed)
+
+
 # ── JWT tokens ────────────────────────────────────────────────────
 
 def create_access_token(data: dict[str, Any], expires_minutes: int | None = None) -> str:
@@ -69,11 +81,14 @@ def verify_mfa_code(secret: str, code: str) -> bool:
 class CurrentUser:
     """Extracted from JWT token."""
 
-    def __init__(self, user_id: str, tenant_id: str | None, role: str, email: str):
+    def __init__(
+        self, user_id: str, tenant_id: str | None, role: str, email: str, name: str = ""
+    ):
         self.user_id = user_id
         self.tenant_id = tenant_id  # None for SOC staff
         self.role = role
         self.email = email
+        self.name = name
 
     @property
     def is_soc_staff(self) -> bool:
@@ -91,6 +106,7 @@ async def get_current_user(
         tenant_id=payload["tenant_id"],
         role=payload["role"],
         email=payload["email"],
+        name=payload.get("name") or "",
     )
 
 
@@ -7,6 +7,8 @@ Handles authentication, request caching, status mapping, and error handling.
 Reference: RuSIEM API User Guide 2026
 """
 
+import hashlib
+import json
 import logging
 from enum import Enum
 
@@ -72,19 +74,28 @@ class RuSIEMClient:
         tenant_uuid: str | None = None,
         redis_client: redis.Redis | None = None,
         verify_ssl: bool = False,
+        http: httpx.AsyncClient | None = None,
     ):
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self.tenant_uuid = tenant_uuid
         self.redis = redis_client
-        self.http = httpx.AsyncClient(
-            base_url=f"{self.base_url}/api/v1",
+        # A shared pool (see make_http) keeps connections alive across
+        # clients; a client only closes the pool it created itself.
+        self._owns_http = http is None
+        self.http = http or self.make_http(self.base_url, verify_ssl)
+
+    @staticmethod
+    def make_http(base_url: str, verify_ssl: bool = False) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            base_url=f"{base_url.rstrip('/')}/api/v1",
             verify=verify_ssl,
             timeout=httpx.Timeout(30.0, connect=10.0),
         )
 
     async def close(self):
-        await self.http.aclose()
+        if self._owns_http:
+            await self.http.aclose()
 
     # ── Internal helpers ─────────────────────────────────────────
 
@@ -103,10 +114,12 @@ class RuSIEMClient:
 
         # Check cache
         if self.redis and cache_ttl > 0:
-            cache_key = f"rusiem:{self.tenant_uuid or 'default'}:{path}:{hash(str(sorted(full_params.items())))}"
+            # Built-in hash() is salted per process, so use a stable digest
+            # that every API worker resolves to the same key.
+            params_digest = hashlib.sha1(str(sorted(full_params.items())).encode()).hexdigest()
+            cache_key = f"rusiem:{self.tenant_uuid or 'default'}:{path}:{params_digest}"
             cached = await self.redis.get(cache_key)
             if cached:
-                import json
                 logger.debug(f"Cache hit: {path}")
                 return json.loads(cached)
 
@@ -127,7 +140,6 @@ class RuSIEMClient:
 
         # Store in cache
         if self.redis and cache_ttl > 0:
-            import json
             await self.redis.setex(cache_key, cache_ttl, json.dumps(data, default=str))
 
         return data
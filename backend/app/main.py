@@ -7,7 +7,7 @@ from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
@@ -27,9 +27,15 @@ async def lifespan(application: FastAPI):
     logger.info(f"Environment: {settings.APP_ENV}")
     yield
     # Cleanup
-    from app.core.dependencies import _redis_pool
+    from app.core.dependencies import _redis_pool, _redis_bytes_pool, _rusiem_http
     if _redis_pool:
         await _redis_pool.close()
+    if _redis_bytes_pool:
+        await _redis_bytes_pool.close()
+    if _rusiem_http:
+        await _rusiem_http.aclose()
+    from app.services.report_service import shutdown_pdf_pool
+    shutdown_pdf_pool()
     logger.info("MSSP SOC Portal shut down.")
 
 
@@ -39,6 +45,7 @@ def create_app() -> FastAPI:
         description="Multi-tenant client portal for MSSP SOC services",
         version="0.2.0",
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
         docs_url="/api/docs" if settings.APP_DEBUG else None,
         redoc_url="/api/redoc" if settings.APP_DEBUG else None,
     )
@@ -91,6 +98,18 @@ def create_app() -> FastAPI:
     async def health():
         return {"status": "ok", "version": "0.2.0"}
 
+    @application.get("/healthz/db")
+    async def health_db():
+        from sqlalchemy import text
+        from app.core.database import engine, pool_stats
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        except Exception as e:
+            logger.warning(f"DB health check failed: {e}")
+            return ORJSONResponse({"status": "unavailable", "pool": pool_stats()}, status_code=503)
+        return {"status": "ok", "pool": pool_stats()}
+
     return application
 
 
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, DateTime, Enum, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, DateTime, Enum, Float, ForeignKey, Index, Integer, String, Text, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -92,6 +92,10 @@ class User(Base):
 
 class PublishedIncident(Base):
     __tablename__ = "published_incidents"
+    __table_args__ = (
+        # One publication per RuSIEM incident per client (migration 001)
+        Index("ix_incidents_tenant_rusiem", "tenant_id", "rusiem_incident_id", unique=True),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("tenants.id"), nullable=False)
@@ -110,7 +114,9 @@ class PublishedIncident(Base):
     event_count: Mapped[int] = mapped_column(Integer, default=0)
     symptoms: Mapped[list | None] = mapped_column(JSONB, nullable=True)
     rusiem_created_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
-    rusiem_raw_data: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
+    # Full RuSIEM payload, kept for reference only; deferred so list and
+    # report queries don't pull it over the wire.
+    rusiem_raw_data: Mapped[dict | None] = mapped_column(JSONB, nullable=True, deferred=True)
 
     # ── SOC analyst fills in ──
     status: Mapped[str] = mapped_column(INCIDENT_STATUS, default="new")
@@ -199,6 +205,13 @@ class SlaSnapshot(Base):
 
 class LogSource(Base):
     __tablename__ = "log_sources"
+    __table_args__ = (
+        # One active source per host per client (migration 010)
+        Index(
+            "uq_logsource_tenant_host_active", "tenant_id", "host",
+            unique=True, postgresql_where=text("is_active"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("tenants.id"), nullable=False)
@@ -1,50 +1,67 @@
 """Seed a demo tenant with RuSIEM connection.
 
-Usage: python -m app.scripts.seed_tenant <name> <short_name> [rusiem_url] [rusiem_key] [email]
+Usage:
+    python -m app.scripts.seed_tenant <name> <short_name> [rusiem_url] [rusiem_key] [email]
+    python -m app.scripts.seed_tenant --interactive
+
+Missing required arguments are prompted for interactively.
 """
+import argparse
 import asyncio
-import sys
 import os
 
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
-
 from sqlalchemy import select
+
 from app.core.database import AsyncSessionLocal
 from app.models.models import Tenant
 
 
-async def create_tenant():
-    if len(sys.argv) < 3:
-        print("Usage: python -m app.scripts.seed_tenant <name> <short_name> [rusiem_url] [rusiem_key] [email]")
-        print("Example: python -m app.scripts.seed_tenant IDS ids")
-        sys.exit(1)
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Seed a tenant with RuSIEM connection")
+    parser.add_argument("name", nargs="?")
+    parser.add_argument("short_name", nargs="?")
+    parser.add_argument("rusiem_url", nargs="?")
+    parser.add_argument("rusiem_key", nargs="?")
+    parser.add_argument("email", nargs="?")
+    parser.add_argument("-i", "--interactive", action="store_true", help="prompt for all values")
+    args = parser.parse_args()
+
+    if args.interactive or not args.name or not args.short_name:
+        args.name = args.name or input("Tenant name: ").strip()
+        args.short_name = args.short_name or input("Short name: ").strip()
+        args.rusiem_url = args.rusiem_url or input("RuSIEM URL (empty for env default): ").strip() or None
+        args.rusiem_key = args.rusiem_key or input("RuSIEM API key (empty for env default): ").strip() or None
+        args.email = args.email or input("Contact email (optional): ").strip() or None
+
+    if not args.name or not args.short_name:
+        parser.error("name and short_name are required")
+
+    args.rusiem_url = args.rusiem_url or os.getenv("RUSIEM_API_URL", "https://172.16.177.216")
+    args.rusiem_key = args.rusiem_key or os.getenv("RUSIEM_API_KEY", "")
+    return args
 
-    name = sys.argv[1]
-    short_name = sys.argv[2]
-    rusiem_url = sys.argv[3] if len(sys.argv) > 3 else os.getenv("RUSIEM_API_URL", "https://172.16.177.216")
-    rusiem_key = sys.argv[4] if len(sys.argv) > 4 else os.getenv("RUSIEM_API_KEY", "")
-    contact_email = sys.argv[5] if len(sys.argv) > 5 else None
 
+async def create_tenant(args: argparse.Namespace):
     async with AsyncSessionLocal() as db:
-        result = await db.execute(select(Tenant).where(Tenant.short_name == short_name))
+        result = await db.execute(select(Tenant).where(Tenant.short_name == args.short_name))
         existing = result.scalar_one_or_none()
         if existing:
-            print(f"Tenant '{short_name}' already exists (id: {existing.id})")
+            print(f"Tenant '{args.short_name}' already exists (id: {existing.id})")
             return
 
         tenant = Tenant(
-            name=name,
-            short_name=short_name,
-            rusiem_api_url=rusiem_url,
-            rusiem_api_key=rusiem_key,
-            contact_email=contact_email,
+            name=args.name,
+            short_name=args.short_name,
+            rusiem_api_url=args.rusiem_url,
+            rusiem_api_key=args.rusiem_key,
+            contact_email=args.email,
             is_active=True,
         )
         db.add(tenant)
         await db.commit()
         await db.refresh(tenant)
-        print(f"Tenant created! ID: {tenant.id} | Name: {tenant.name} | RuSIEM: {rusiem_url}")
+        print(f"Tenant created! ID: {tenant.id} | Name: {tenant.name} | RuSIEM: {args.rusiem_url}")
 
 
 if __name__ == "__main__":
-    asyncio.run(create_tenant())
+    asyncio.run(create_tenant(_parse_args()))
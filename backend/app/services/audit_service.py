@@ -0,0 +1,38 @@
+"""
+Audit log writer.
+
+Audit rows are written in their own short-lived session (open, insert,
+commit, close) so they don't grow the business transaction, and a failed
+audit insert never rolls back the operation it describes.
+"""
+
+import logging
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.database import AsyncSessionLocal
+from app.models.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+async def write_audit_log(
+    values: dict | list[dict],
+    session_factory: async_sessionmaker[AsyncSession] = AsyncSessionLocal,
+) -> None:
+    """Insert audit_logs row(s) in an isolated transaction.
+
+    Accepts one row or a list for bulk operations. Pass through
+    ``after_commit(db, partial(write_audit_log, {...}))`` to record only
+    operations that actually committed.
+    """
+    rows = [values] if isinstance(values, dict) else values
+    if not rows:
+        return
+    try:
+        async with session_factory() as session:
+            await session.execute(insert(AuditLog), rows)
+            await session.commit()
+    except Exception as e:
+        logger.warning(f"Audit write failed ({rows[0].get('action')}): {e}")
@@ -4,6 +4,7 @@ Authentication service.
 Handles: login flow, Email OTP verification, token management, user lookup.
 """
 
+import asyncio
 import logging
 import secrets
 from datetime import datetime, timezone, timedelta
@@ -16,9 +17,11 @@ from app.core.security import (
     create_refresh_token,
     decode_token,
     hash_password,
-    verify_password,
+    hash_password_async,
+    verify_password_async,
 )
-from app.models.models import User, AuditLog
+from app.models.models import User
+from app.services.audit_service import write_audit_log
 from app.services.email_service import send_email, otp_email
 
 logger = logging.getLogger(__name__)
@@ -26,6 +29,10 @@ logger = logging.getLogger(__name__)
 OTP_LENGTH = 6
 OTP_TTL_MINUTES = 5
 
+# Verified against when the email is unknown, so both login branches pay
+# the same bcrypt cost and response time doesn't reveal account existence.
+_DUMMY_HASH = hash_password("x" * 16)
+
 
 def _generate_otp() -> str:
     """Generate a random numeric OTP code."""
@@ -67,9 +74,10 @@ class AuthService:
         """
         user = await self.get_user_by_email(email)
         if not user:
+            await verify_password_async(password, _DUMMY_HASH)
             raise AuthError("Неверный email или пароль")
 
-        if not verify_password(password, user.password_hash):
+        if not await verify_password_async(password, user.password_hash):
             await self._log_action(user, "login_failed", ip_address=ip_address)
             raise AuthError("Неверный email или пароль")
 
@@ -114,7 +122,9 @@ class AuthService:
         await self.db.flush()
 
         subject, html = otp_email(code, OTP_TTL_MINUTES)
-        sent = send_email(user.email, subject, html)
+        # SMTP is blocking; keep it off the event loop but still in-request,
+        # since the caller needs to know whether the code was delivered.
+        sent = await asyncio.to_thread(send_email, user.email, subject, html)
         if not sent:
             logger.error(f"Failed to send OTP email to {user.email}")
             raise AuthError("Не удалось отправить код. Проверьте настройки SMTP.", 503)
@@ -231,13 +241,13 @@ class AuthService:
         if not user:
             raise AuthError("Пользователь не найден", 404)
 
-        if not verify_password(old_password, user.password_hash):
+        if not await verify_password_async(old_password, user.password_hash):
             raise AuthError("Текущий пароль неверный", 400)
 
         if len(new_password) < 12:
             raise AuthError("Пароль должен содержать минимум 12 символов", 400)
 
-        user.password_hash = hash_password(new_password)
+        user.password_hash = await hash_password_async(new_password)
         await self.db.flush()
         await self._log_action(user, "password_changed")
 
@@ -262,13 +272,13 @@ class AuthService:
     async def _log_action(
         self, user: User, action: str, ip_address: str = "", details: dict | None = None
     ) -> None:
-        log = AuditLog(
-            tenant_id=user.tenant_id,
-            user_id=user.id,
-            action=action,
-            resource_type="auth",
-            ip_address=ip_address or None,
-            details=details,
-        )
-        self.db.add(log)
-        await self.db.flush()
+        # Written straight away in its own transaction: failed attempts are
+        # followed by an AuthError that rolls the request session back.
+        await write_audit_log({
+            "tenant_id": user.tenant_id,
+            "user_id": user.id,
+            "action": action,
+            "resource_type": "auth",
+            "ip_address": ip_address or None,
+            "details": details,
+        })
@@ -6,73 +6,213 @@ Sends email notifications via SMTP (Mail.ru, Yandex, Gmail, etc).
 
 import logging
 import smtplib
+from dataclasses import dataclass
+from email.charset import Charset
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 
+from jinja2 import Environment, PackageLoader
+
 from app.core.config import get_settings
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
 
-def send_email(to: str, subject: str, html_body: str) -> bool:
-    """Send an email via SMTP. Returns True on success."""
-    if not settings.SMTP_USER or not settings.SMTP_PASSWORD:
-        logger.warning("SMTP not configured, skipping email")
-        return False
-
-    msg = MIMEMultipart("alternative")
-    msg["From"] = settings.SMTP_FROM
-    msg["To"] = to
-    msg["Subject"] = subject
-    msg.attach(MIMEText(html_body, "html", "utf-8"))
-
-    try:
-        if settings.SMTP_PORT == 465:
+@dataclass(frozen=True, slots=True)
+class _Smtp:
+    """SMTP settings snapshot; plain attributes for the per-message path."""
+    host: str
+    port: int
+    user: str
+    password: str
+    tls: bool
+    sender: str
+
+
+_smtp = _Smtp(
+    host=settings.SMTP_HOST,
+    port=settings.SMTP_PORT,
+    user=settings.SMTP_USER,
+    password=settings.SMTP_PASSWORD,
+    tls=settings.SMTP_TLS,
+    sender=settings.SMTP_FROM,
+)
+
+# UTF-8 without a transfer encoding, for servers that advertise 8BITMIME:
+# the HTML goes out as-is instead of being base64-encoded per message.
+_UTF8_8BIT = Charset("utf-8")
+_UTF8_8BIT.body_encoding = None
+
+# RFC 5321 line limit (octets, without CRLF). Unencoded bodies are only
+# sent when every line fits; long user text otherwise gets hard-wrapped or
+# rejected by the server.
+SMTP_MAX_LINE = 998
+
+
+def _fits_8bit(html_body: str) -> bool:
+    return max(map(len, html_body.encode().splitlines()), default=0) <= SMTP_MAX_LINE
+
+
+class SmtpSession:
+    """One SMTP connection reused for several messages.
+
+    Connects lazily on the first send, checks the connection with NOOP
+    before each later send and reconnects after
+    ``max_messages_per_connection`` messages, since providers (Mail.ru)
+    throttle both new connections and long-lived sessions.
+
+    Usage:
+        with SmtpSession() as session:
+            for to in recipients:
+                session.send(to, subject, html_body)
+    """
+
+    def __init__(self, max_messages_per_connection: int = 100):
+        self.max_messages_per_connection = max_messages_per_connection
+        self._server: smtplib.SMTP | None = None
+        self._sent_on_connection = 0
+        self._body_key: tuple[str, bool] | None = None
+        self._body_part: MIMEText | None = None
+        self._body_8bit = False
+
+    def __enter__(self) -> "SmtpSession":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _connect(self) -> smtplib.SMTP:
+        if _smtp.port == 465:
             # SSL
-            with smtplib.SMTP_SSL(settings.SMTP_HOST, settings.SMTP_PORT, timeout=15) as server:
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                server.send_message(msg)
+            server = smtplib.SMTP_SSL(_smtp.host, _smtp.port, timeout=15)
         else:
             # STARTTLS
-            with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT, timeout=15) as server:
-                if settings.SMTP_TLS:
-                    server.starttls()
-                server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
-                server.send_message(msg)
+            server = smtplib.SMTP(_smtp.host, _smtp.port, timeout=15)
+            if _smtp.tls:
+                server.starttls()
+        server.login(_smtp.user, _smtp.password)
+        self._sent_on_connection = 0
+        return server
 
-        logger.info(f"Email sent to {to}: {subject}")
-        return True
-    except Exception as e:
-        logger.error(f"Failed to send email to {to}: {e}")
-        return False
+    def _ensure_connected(self) -> smtplib.SMTP:
+        if self._server is not None:
+            if self._sent_on_connection >= self.max_messages_per_connection:
+                self.close()
+            else:
+                try:
+                    code, _ = self._server.noop()
+                except smtplib.SMTPException:
+                    code = None
+                if code != 250:
+                    self.close()
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
 
+    def _html_part(self, html_body: str, server_8bit: bool) -> tuple[MIMEText, bool]:
+        """HTML part for the body and whether it goes out as 8bit.
 
-# ── Email templates ──────────────────────────────────────────────
+        Bulk sends repeat one body for every recipient; encode it once
+        and attach the same part to each message.
+        """
+        key = (html_body, server_8bit)
+        if self._body_key != key:
+            self._body_8bit = server_8bit and _fits_8bit(html_body)
+            self._body_part = MIMEText(
+                html_body, "html", _UTF8_8BIT if self._body_8bit else "utf-8"
+            )
+            self._body_key = key
+        return self._body_part, self._body_8bit
+
+    def send(self, to: str, subject: str, html_body: str) -> bool:
+        """Send one email over the shared connection. Returns True on success."""
+        if not _smtp.user or not _smtp.password:
+            logger.warning("SMTP not configured, skipping email")
+            return False
 
-def _base_template(content: str) -> str:
-    return f"""<!DOCTYPE html>
-<html><head><meta charset="utf-8"></head>
-<body style="margin:0;padding:0;font-family:'Segoe UI',Arial,sans-serif;background:#f1f5f9;">
-<div style="max-width:600px;margin:20px auto;background:#fff;border-radius:12px;overflow:hidden;box-shadow:0 2px 8px rgba(0,0,0,0.08);">
-    <div style="background:linear-gradient(135deg,#0f172a,#1e3a5f);padding:20px 30px;color:#fff;">
-        <h1 style="margin:0;font-size:18px;">🛡️ MSSP SOC Portal</h1>
-    </div>
-    <div style="padding:25px 30px;color:#1a1a2e;line-height:1.6;">
-        {content}
-    </div>
-    <div style="padding:15px 30px;background:#f8fafc;border-top:1px solid #e2e8f0;text-align:center;color:#94a3b8;font-size:12px;">
-        MSSP SOC Portal • Уведомление сгенерировано автоматически
-    </div>
-</div>
-</body></html>"""
+        try:
+            server = self._ensure_connected()
+            part, eight_bit = self._html_part(html_body, server.has_extn("8bitmime"))
 
+            msg = MIMEMultipart("alternative")
+            msg["From"] = _smtp.sender
+            msg["To"] = to
+            msg["Subject"] = subject
+            msg.attach(part)
+
+            server.send_message(msg, mail_options=["BODY=8BITMIME"] if eight_bit else [])
+            self._sent_on_connection += 1
+            logger.info(f"Email sent to {to}: {subject}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to send email to {to}: {e}")
+            self.close()
+            return False
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+
+def send_email(to: str, subject: str, html_body: str) -> bool:
+    """Send a single email via SMTP. Returns True on success."""
+    with SmtpSession() as session:
+        return session.send(to, subject, html_body)
+
+
+def send_emails_bulk(messages: list[tuple[str, str, str]]) -> int:
+    """Send (to, subject, html_body) messages over one SMTP connection.
+
+    Aborts the batch once more than a third of the messages have failed,
+    so a broken SMTP setup doesn't hammer the server with every message.
+    Returns the number of messages sent successfully.
+    """
+    sent = 0
+    failed = 0
+    with SmtpSession() as session:
+        for to, subject, html_body in messages:
+            if session.send(to, subject, html_body):
+                sent += 1
+            else:
+                failed += 1
+                if failed * 3 > len(messages):
+                    logger.error(f"Aborting email batch: {failed} of {len(messages)} failed")
+                    break
+    return sent
+
+
+# ── Email templates ──────────────────────────────────────────────
+# Templates live in email_templates/ and are compiled once at import; the
+# optional blocks ({% if portal_url %} etc.) are branches in the compiled
+# code, so rendering never rebuilds or re-resolves template source.
+
+_env = Environment(
+    loader=PackageLoader("app.services", "email_templates"),
+    autoescape=True,
+    auto_reload=False,
+)
+_new_incident_tpl = _env.get_template("new_incident.html")
+_status_change_tpl = _env.get_template("status_change.html")
+_otp_tpl = _env.get_template("otp.html")
+_new_comment_tpl = _env.get_template("new_comment.html")
 
 PRIORITY_COLORS = {
     "critical": "#ef4444", "high": "#f97316",
     "medium": "#eab308", "low": "#3b82f6",
 }
 
+STATUS_LABELS = {
+    "new": "Новый", "in_progress": "В работе",
+    "awaiting_customer": "Ожидание клиента", "awaiting_soc": "Ожидание SOC",
+    "resolved": "Решён", "closed": "Закрыт",
+}
+
 
 def new_incident_email(
     incident_title: str,
@@ -82,32 +222,16 @@ def new_incident_email(
     portal_url: str = "",
 ) -> tuple[str, str]:
     """Returns (subject, html_body) for new incident notification."""
-    color = PRIORITY_COLORS.get(priority, "#6b7280")
     subject = f"[SOC] Новый инцидент #{rusiem_id}: {incident_title[:50]}"
-    content = f"""
-    <h2 style="margin:0 0 15px;color:#1e3a5f;">Новый инцидент опубликован</h2>
-    <table style="width:100%;border-collapse:collapse;">
-        <tr>
-            <td style="padding:8px 0;color:#64748b;width:140px;">RuSIEM ID</td>
-            <td style="padding:8px 0;font-weight:600;">#{rusiem_id}</td>
-        </tr>
-        <tr>
-            <td style="padding:8px 0;color:#64748b;">Название</td>
-            <td style="padding:8px 0;font-weight:600;">{incident_title}</td>
-        </tr>
-        <tr>
-            <td style="padding:8px 0;color:#64748b;">Приоритет</td>
-            <td style="padding:8px 0;">
-                <span style="background:{color};color:#fff;padding:3px 12px;border-radius:12px;font-size:13px;font-weight:600;">
-                    {priority.upper()}
-                </span>
-            </td>
-        </tr>
-    </table>
-    {"<div style='margin-top:15px;padding:12px 16px;background:#f0f9ff;border-left:3px solid #3b82f6;border-radius:0 6px 6px 0;'><strong>Рекомендации:</strong><br>" + recommendations + "</div>" if recommendations else ""}
-    {f'<div style="margin-top:20px;"><a href="{portal_url}" style="background:#3b82f6;color:#fff;padding:10px 24px;border-radius:8px;text-decoration:none;font-weight:600;">Открыть в портале</a></div>' if portal_url else ""}
-    """
-    return subject, _base_template(content)
+    html = _new_incident_tpl.render(
+        title=incident_title,
+        rusiem_id=rusiem_id,
+        priority=priority,
+        color=PRIORITY_COLORS.get(priority, "#6b7280"),
+        recommendations=recommendations,
+        portal_url=portal_url,
+    )
+    return subject, html
 
 
 def status_change_email(
@@ -119,45 +243,23 @@ def status_change_email(
     portal_url: str = "",
 ) -> tuple[str, str]:
     """Returns (subject, html_body) for status change notification."""
-    status_labels = {
-        "new": "Новый", "in_progress": "В работе",
-        "awaiting_customer": "Ожидание клиента", "awaiting_soc": "Ожидание SOC",
-        "resolved": "Решён", "closed": "Закрыт",
-    }
-    subject = f"[SOC] Статус изменён #{rusiem_id}: {status_labels.get(new_status, new_status)}"
-    content = f"""
-    <h2 style="margin:0 0 15px;color:#1e3a5f;">Статус инцидента изменён</h2>
-    <p><strong>#{rusiem_id}</strong> — {incident_title}</p>
-    <div style="margin:15px 0;padding:15px;background:#f8fafc;border-radius:8px;text-align:center;">
-        <span style="color:#64748b;">{status_labels.get(old_status, old_status)}</span>
-        <span style="margin:0 10px;font-size:18px;">→</span>
-        <span style="color:#1e3a5f;font-weight:600;">{status_labels.get(new_status, new_status)}</span>
-    </div>
-    <p style="color:#64748b;font-size:13px;">Изменил: {changed_by}</p>
-    {f'<div style="margin-top:15px;"><a href="{portal_url}" style="background:#3b82f6;color:#fff;padding:10px 24px;border-radius:8px;text-decoration:none;font-weight:600;">Открыть в портале</a></div>' if portal_url else ""}
-    """
-    return subject, _base_template(content)
+    subject = f"[SOC] Статус изменён #{rusiem_id}: {STATUS_LABELS.get(new_status, new_status)}"
+    html = _status_change_tpl.render(
+        title=incident_title,
+        rusiem_id=rusiem_id,
+        old_label=STATUS_LABELS.get(old_status, old_status),
+        new_label=STATUS_LABELS.get(new_status, new_status),
+        changed_by=changed_by,
+        portal_url=portal_url,
+    )
+    return subject, html
 
 
 def otp_email(code: str, ttl_minutes: int = 5) -> tuple[str, str]:
     """Returns (subject, html_body) for Email OTP verification."""
     subject = f"[SOC] Код подтверждения: {code}"
-    content = f"""
-    <h2 style="margin:0 0 15px;color:#1e3a5f;">Код подтверждения входа</h2>
-    <p>Используйте этот код для входа в MSSP SOC Portal:</p>
-    <div style="margin:20px 0;text-align:center;">
-        <span style="display:inline-block;font-size:32px;font-weight:700;letter-spacing:0.3em;
-                      padding:16px 32px;background:#f0f9ff;border:2px solid #3b82f6;
-                      border-radius:12px;color:#1e3a5f;font-family:monospace;">
-            {code}
-        </span>
-    </div>
-    <p style="color:#64748b;font-size:13px;">
-        Код действителен <strong>{ttl_minutes} минут</strong>.<br>
-        Если вы не запрашивали вход — проигнорируйте это письмо.
-    </p>
-    """
-    return subject, _base_template(content)
+    html = _otp_tpl.render(code=code, ttl_minutes=ttl_minutes)
+    return subject, html
 
 
 def new_comment_email(
@@ -169,13 +271,11 @@ def new_comment_email(
 ) -> tuple[str, str]:
     """Returns (subject, html_body) for new comment notification."""
     subject = f"[SOC] Новый комментарий #{rusiem_id}"
-    content = f"""
-    <h2 style="margin:0 0 15px;color:#1e3a5f;">Новый комментарий</h2>
-    <p><strong>#{rusiem_id}</strong> — {incident_title}</p>
-    <div style="margin:15px 0;padding:12px 16px;background:#f8fafc;border-left:3px solid #3b82f6;border-radius:0 6px 6px 0;">
-        <div style="font-size:12px;color:#64748b;margin-bottom:5px;">{comment_by}</div>
-        <div>{comment_text}</div>
-    </div>
-    {f'<div style="margin-top:15px;"><a href="{portal_url}" style="background:#3b82f6;color:#fff;padding:10px 24px;border-radius:8px;text-decoration:none;font-weight:600;">Ответить в портале</a></div>' if portal_url else ""}
-    """
-    return subject, _base_template(content)
+    html = _new_comment_tpl.render(
+        title=incident_title,
+        rusiem_id=rusiem_id,
+        comment_by=comment_by,
+        comment_text=comment_text,
+        portal_url=portal_url,
+    )
+    return subject, html
@@ -9,18 +9,26 @@ Core business logic:
 - List/filter incidents
 """
 
+import asyncio
 import logging
 import uuid
 from datetime import datetime, timezone
+from functools import partial
 
-from sqlalchemy import select, func
+from sqlalchemy import insert, select, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, load_only, selectinload
 
+from app.core.database import after_commit
 from app.integrations.rusiem.client import RuSIEMClient
 from app.models.models import (
     PublishedIncident, IncidentComment, IncidentStatusChange,
-    Notification, Tenant, AuditLog, User,
+    Notification, Tenant, User, utcnow,
+)
+from app.services.audit_service import write_audit_log
+from app.tasks.worker import (
+    send_comment_email, send_incident_email, send_status_change_email,
 )
 
 logger = logging.getLogger(__name__)
@@ -47,19 +55,25 @@ class IncidentServiceError(Exception):
 # ── Status transition rules ───────────────────────────────────────
 
 # Who can transition to which statuses
-CLIENT_TRANSITIONS = {
-    "new": ["in_progress"],
-    "in_progress": ["awaiting_soc", "resolved"],
-    "awaiting_customer": ["in_progress"],
-    "resolved": ["closed"],
+CLIENT_TRANSITIONS: dict[str, frozenset[str]] = {
+    "new": frozenset({"in_progress"}),
+    "in_progress": frozenset({"awaiting_soc", "resolved"}),
+    "awaiting_customer": frozenset({"in_progress"}),
+    "resolved": frozenset({"closed"}),
+}
+
+SOC_TRANSITIONS: dict[str, frozenset[str]] = {
+    "new": frozenset({"in_progress", "awaiting_customer", "false_positive"}),
+    "in_progress": frozenset({"awaiting_customer", "resolved", "false_positive"}),
+    "awaiting_soc": frozenset({"in_progress", "awaiting_customer", "resolved", "false_positive"}),
+    "awaiting_customer": frozenset({"in_progress", "false_positive"}),
+    "resolved": frozenset({"closed", "in_progress", "false_positive"}),
 }
 
-SOC_TRANSITIONS = {
-    "new": ["in_progress", "awaiting_customer", "false_positive"],
-    "in_progress": ["awaiting_customer", "resolved", "false_positive"],
-    "awaiting_soc": ["in_progress", "awaiting_customer", "resolved", "false_positive"],
-    "awaiting_customer": ["in_progress", "false_positive"],
-    "resolved": ["closed", "in_progress", "false_positive"],
+# (is_soc, current status) -> allowed target statuses
+_TRANSITIONS: dict[tuple[bool, str], frozenset[str]] = {
+    **{(False, k): v for k, v in CLIENT_TRANSITIONS.items()},
+    **{(True, k): v for k, v in SOC_TRANSITIONS.items()},
 }
 
 
@@ -67,6 +81,8 @@ class IncidentService:
     def __init__(self, db: AsyncSession, rusiem: RuSIEMClient | None = None):
         self.db = db
         self.rusiem = rusiem
+        # Recipients per tenant, reused across writes handled by this service
+        self._tenant_emails: dict[uuid.UUID, list[str]] = {}
 
     # ── Preview (auto-fill from RuSIEM) ───────────────────────────
 
@@ -81,8 +97,10 @@ class IncidentService:
             raise IncidentServiceError("Клиент RuSIEM не настроен", 500)
 
         try:
-            incident = await self.rusiem.get_incident(rusiem_incident_id)
-            fullinfo = await self.rusiem.get_incident_fullinfo(rusiem_incident_id)
+            incident, fullinfo = await asyncio.gather(
+                self.rusiem.get_incident(rusiem_incident_id),
+                self.rusiem.get_incident_fullinfo(rusiem_incident_id),
+            )
         except Exception as e:
             logger.error(f"Failed to fetch incident {rusiem_incident_id} from RuSIEM: {e}")
             raise IncidentServiceError(
@@ -96,10 +114,10 @@ class IncidentService:
     async def publish_incident(
         self,
         rusiem_incident_id: int,
-        tenant_id: str,
+        tenant_id: uuid.UUID,
         recommendations: str,
         soc_actions: str | None,
-        published_by_id: str,
+        published_by_id: uuid.UUID,
         incident_type: str | None = None,
     ) -> PublishedIncident:
         """Publish a RuSIEM incident to a specific client.
@@ -109,99 +127,113 @@ class IncidentService:
         3. Create initial status change (-> new)
         4. Create notification for client
         """
-        # Verify tenant exists
-        tenant = await self.db.execute(
-            select(Tenant).where(Tenant.id == tenant_id, Tenant.is_active == True)  # noqa: E712
+        # Verify the tenant and look for an earlier publish while RuSIEM is
+        # fetched and mapped, so the lookup doesn't add a round-trip of its
+        # own. Tenant/duplicate errors take precedence over a RuSIEM failure.
+        already_published = (
+            select(PublishedIncident.id)
+            .where(
+                PublishedIncident.tenant_id == tenant_id,
+                PublishedIncident.rusiem_incident_id == rusiem_incident_id,
+            )
+            .exists()
+        )
+        tenant, preview = await asyncio.gather(
+            self.db.execute(
+                select(Tenant.name, Tenant.short_name, already_published.label("published"))
+                .where(Tenant.id == tenant_id, Tenant.is_active == True)  # noqa: E712
+            ),
+            self.preview_from_rusiem(rusiem_incident_id),
+            return_exceptions=True,
         )
-        tenant_obj = tenant.scalar_one_or_none()
+        if isinstance(tenant, BaseException):
+            raise tenant
+        tenant_obj = tenant.one_or_none()
         if not tenant_obj:
             raise IncidentServiceError(f"Клиент {tenant_id} не найден", 404)
-
-        # Check if already published to this tenant
-        existing = await self.db.execute(
-            select(PublishedIncident).where(
-                PublishedIncident.rusiem_incident_id == rusiem_incident_id,
-                PublishedIncident.tenant_id == tenant_id,
+        if tenant_obj.published:
+            raise IncidentServiceError(
+                f"Инцидент #{rusiem_incident_id} уже опубликован для {tenant_obj.name}", 409
             )
+        if isinstance(preview, BaseException):
+            raise preview
+
+        # Create incident. The unique (tenant_id, rusiem_incident_id) index
+        # still guards concurrent publishes; no row comes back on conflict.
+        stmt = (
+            pg_insert(PublishedIncident)
+            .on_conflict_do_nothing(index_elements=["tenant_id", "rusiem_incident_id"])
+            .returning(PublishedIncident)
         )
-        if existing.scalar_one_or_none():
+        result = await self.db.scalars(stmt, [{
+            "id": uuid.uuid4(),
+            "tenant_id": tenant_id,
+            "rusiem_incident_id": rusiem_incident_id,
+            "title": preview["title"],
+            "description": preview.get("description"),
+            "priority": preview["priority"],
+            "priority_num": preview["priority_num"],
+            "category": incident_type or preview.get("category"),
+            "mitre_id": preview.get("mitre_id"),
+            "source_ips": preview.get("source_ips", []),
+            "source_hostnames": preview.get("source_hostnames", []),
+            "event_source_ips": preview.get("event_source_ips", []),
+            "event_count": preview.get("event_count", 0),
+            "symptoms": preview.get("symptoms", []),
+            "rusiem_created_at": _parse_dt(preview.get("created_at")),
+            "rusiem_raw_data": preview.get("rusiem_raw_data"),
+            "status": "new",
+            "recommendations": recommendations,
+            "soc_actions": soc_actions,
+            "published_by": published_by_id,
+        }])
+        incident = result.one_or_none()
+        if incident is None:
             raise IncidentServiceError(
                 f"Инцидент #{rusiem_incident_id} уже опубликован для {tenant_obj.name}", 409
             )
 
-        # Fetch and map from RuSIEM
-        preview = await self.preview_from_rusiem(rusiem_incident_id)
-
-        # Create incident
-        incident = PublishedIncident(
-            tenant_id=uuid.UUID(tenant_id),
-            rusiem_incident_id=rusiem_incident_id,
-            title=preview["title"],
-            description=preview.get("description"),
-            priority=preview["priority"],
-            priority_num=preview["priority_num"],
-            category=incident_type or preview.get("category"),
-            mitre_id=preview.get("mitre_id"),
-            source_ips=preview.get("source_ips", []),
-            source_hostnames=preview.get("source_hostnames", []),
-            event_source_ips=preview.get("event_source_ips", []),
-            event_count=preview.get("event_count", 0),
-            symptoms=preview.get("symptoms", []),
-            rusiem_created_at=_parse_dt(preview.get("created_at")),
-            rusiem_raw_data=preview.get("rusiem_raw_data"),
-            status="new",
-            recommendations=recommendations,
-            soc_actions=soc_actions,
-            published_by=uuid.UUID(published_by_id),
-        )
-        self.db.add(incident)
-        await self.db.flush()
-
-        # Initial status change
-        self.db.add(IncidentStatusChange(
-            incident_id=incident.id,
-            user_id=uuid.UUID(published_by_id),
-            old_status="none",
-            new_status="new",
-            comment="Incident published to client",
-        ))
-
-        # Notification for client
-        self.db.add(Notification(
-            tenant_id=uuid.UUID(tenant_id),
-            type="new_incident",
-            title=f"New {preview['priority']} incident: {preview['title'][:100]}",
-            message=f"SOC published incident #{rusiem_incident_id}. Please review recommendations.",
-            extra_data={"incident_id": str(incident.id), "priority": preview["priority"]},
-        ))
-
-        # Email notification (async via Celery)
+        # Side-effect rows are never read back in this transaction, so they
+        # go through Core inserts instead of the ORM unit of work.
+        await self.db.execute(insert(IncidentStatusChange), [{
+            "incident_id": incident.id,
+            "user_id": published_by_id,
+            "old_status": "none",
+            "new_status": "new",
+            "comment": "Incident published to client",
+        }])
+        await self.db.execute(insert(Notification), [{
+            "tenant_id": tenant_id,
+            "type": "new_incident",
+            "title": f"New {preview['priority']} incident: {preview['title'][:100]}",
+            "message": f"SOC published incident #{rusiem_incident_id}. Please review recommendations.",
+            "extra_data": {"incident_id": str(incident.id), "priority": preview["priority"]},
+        }])
+        after_commit(self.db, partial(write_audit_log, {
+            "tenant_id": tenant_id,
+            "user_id": published_by_id,
+            "action": "incident_published",
+            "resource_type": "incident",
+            "resource_id": str(incident.id),
+            "details": {"rusiem_id": rusiem_incident_id, "priority": preview["priority"]},
+        }))
+
+        # Email notification (async via Celery, queued once the publish commits)
         try:
             client_emails = await self._get_tenant_emails(tenant_id)
             if client_emails:
-                from app.tasks.worker import send_incident_email
-                send_incident_email.delay(
+                after_commit(self.db, partial(
+                    send_incident_email.delay,
                     client_emails,
                     preview["title"],
                     rusiem_incident_id,
                     preview["priority"],
                     recommendations or "",
                     f"https://soc.itnovation.pro/incidents/{incident.id}",
-                )
+                ))
         except Exception as e:
             logger.warning(f"Failed to queue email: {e}")
 
-        # Audit
-        self.db.add(AuditLog(
-            tenant_id=uuid.UUID(tenant_id),
-            user_id=uuid.UUID(published_by_id),
-            action="incident_published",
-            resource_type="incident",
-            resource_id=str(incident.id),
-            details={"rusiem_id": rusiem_incident_id, "priority": preview["priority"]},
-        ))
-
-        await self.db.flush()
         logger.info(
             f"Incident #{rusiem_incident_id} published to tenant {tenant_obj.short_name} "
             f"as {incident.id} ({preview['priority']})"
@@ -218,41 +250,40 @@ class IncidentService:
         incident_type: str | None = None,
         mitre_id: str | None = None,
         updated_by_id: str = "",
-    ) -> PublishedIncident:
-        incident = await self._get_incident(incident_id)
-
+    ) -> uuid.UUID:
+        values = {}
         if recommendations is not None:
-            incident.recommendations = recommendations
+            values["recommendations"] = recommendations
         if soc_actions is not None:
-            incident.soc_actions = soc_actions
+            values["soc_actions"] = soc_actions
         if incident_type is not None:
-            incident.category = incident_type
+            values["category"] = incident_type
         if mitre_id is not None:
-            incident.mitre_id = mitre_id
+            values["mitre_id"] = mitre_id
 
-        await self.db.flush()
-        return incident
+        return await self._update_incident(incident_id, values)
 
     # ── Add comment ───────────────────────────────────────────────
 
     async def add_comment(
         self,
         incident_id: str,
-        user_id: str,
+        user_id: uuid.UUID,
         text: str,
         is_soc: bool,
-        tenant_id: str | None = None,
+        tenant_id: uuid.UUID | None = None,
+        user_name: str = "",
     ) -> IncidentComment:
         incident = await self._get_incident(incident_id)
 
         # Client can only comment on their own incidents
-        if not is_soc and tenant_id and str(incident.tenant_id) != tenant_id:
+        if not is_soc and tenant_id and incident.tenant_id != tenant_id:
             raise IncidentServiceError("Доступ запрещён", 403)
 
         comment = IncidentComment(
             tenant_id=incident.tenant_id,
             incident_id=incident.id,
-            user_id=uuid.UUID(user_id),
+            user_id=user_id,
             text=text,
             is_soc=is_soc,
         )
@@ -260,33 +291,27 @@ class IncidentService:
 
         # Notify the other side
         notif_type = "soc_comment" if is_soc else "client_comment"
-        self.db.add(Notification(
-            tenant_id=incident.tenant_id,
-            type=notif_type,
-            title=f"New comment on incident: {incident.title[:80]}",
-            message=text[:200],
-            extra_data={"incident_id": str(incident.id)},
-        ))
+        await self.db.execute(insert(Notification), [{
+            "tenant_id": incident.tenant_id,
+            "type": notif_type,
+            "title": f"New comment on incident: {incident.title[:80]}",
+            "message": text[:200],
+            "extra_data": {"incident_id": str(incident.id)},
+        }])
 
         # Email notification
         try:
-            emails = await self._get_tenant_emails(str(incident.tenant_id))
+            emails = await self._get_tenant_emails(incident.tenant_id)
             if emails:
-                from app.tasks.worker import send_comment_email
-                # Get commenter name
-                commenter = await self.db.execute(
-                    select(User).where(User.id == uuid.UUID(user_id))
-                )
-                commenter_obj = commenter.scalar_one_or_none()
-                commenter_name = commenter_obj.name if commenter_obj else "Пользователь"
-                send_comment_email.delay(
+                after_commit(self.db, partial(
+                    send_comment_email.delay,
                     emails,
                     incident.title,
                     incident.rusiem_incident_id,
-                    commenter_name,
+                    user_name or "Пользователь",
                     text[:300],
                     f"https://soc.itnovation.pro/incidents/{incident.id}",
-                )
+                ))
         except Exception as e:
             logger.warning(f"Failed to queue comment email: {e}")
 
@@ -299,24 +324,24 @@ class IncidentService:
         self,
         incident_id: str,
         new_status: str,
-        user_id: str,
+        user_id: uuid.UUID,
         is_soc: bool,
         comment: str | None = None,
-        tenant_id: str | None = None,
+        tenant_id: uuid.UUID | None = None,
+        user_name: str = "",
     ) -> PublishedIncident:
         incident = await self._get_incident(incident_id)
 
         # Client can only change status of their own incidents
-        if not is_soc and tenant_id and str(incident.tenant_id) != tenant_id:
+        if not is_soc and tenant_id and incident.tenant_id != tenant_id:
             raise IncidentServiceError("Доступ запрещён", 403)
 
         # Validate transition
-        transitions = SOC_TRANSITIONS if is_soc else CLIENT_TRANSITIONS
-        allowed = transitions.get(incident.status, [])
+        allowed = _TRANSITIONS.get((is_soc, incident.status), frozenset())
         if new_status not in allowed:
             raise IncidentServiceError(
                 f"Нельзя перевести из '{incident.status}' в '{new_status}'. "
-                f"Допустимые: {allowed}"
+                f"Допустимые: {sorted(allowed)}"
             )
 
         old_status = incident.status
@@ -324,50 +349,52 @@ class IncidentService:
 
         # Handle closing
         if new_status == "closed":
-            incident.closed_by = uuid.UUID(user_id)
+            incident.closed_by = user_id
             incident.closed_at = datetime.now(timezone.utc)
 
-        # Status change record
-        self.db.add(IncidentStatusChange(
+        # Status change record and client notification in one statement:
+        # the history insert rides as a data-modifying CTE. Ids and
+        # timestamps are set here since column defaults don't run inside it.
+        now = utcnow()
+        status_change = insert(IncidentStatusChange).values(
+            id=uuid.uuid4(),
             incident_id=incident.id,
-            user_id=uuid.UUID(user_id),
+            user_id=user_id,
             old_status=old_status,
             new_status=new_status,
             comment=comment,
-        ))
-
-        # Notification
-        self.db.add(Notification(
-            tenant_id=incident.tenant_id,
-            type="status_change",
-            title=f"Incident status changed: {old_status} → {new_status}",
-            message=comment or f"Incident '{incident.title[:80]}' status updated.",
-            extra_data={
-                "incident_id": str(incident.id),
-                "old_status": old_status,
-                "new_status": new_status,
-            },
-        ))
+            created_at=now,
+        ).cte("status_change")
+        await self.db.execute(
+            insert(Notification).values(
+                id=uuid.uuid4(),
+                tenant_id=incident.tenant_id,
+                type="status_change",
+                title=f"Incident status changed: {old_status} → {new_status}",
+                message=comment or f"Incident '{incident.title[:80]}' status updated.",
+                extra_data={
+                    "incident_id": str(incident.id),
+                    "old_status": old_status,
+                    "new_status": new_status,
+                },
+                created_at=now,
+            ).add_cte(status_change)
+        )
 
         # Email notification
         try:
-            emails = await self._get_tenant_emails(str(incident.tenant_id))
+            emails = await self._get_tenant_emails(incident.tenant_id)
             if emails:
-                from app.tasks.worker import send_status_change_email
-                changer = await self.db.execute(
-                    select(User).where(User.id == uuid.UUID(user_id))
-                )
-                changer_obj = changer.scalar_one_or_none()
-                changer_name = changer_obj.name if changer_obj else "Пользователь"
-                send_status_change_email.delay(
+                after_commit(self.db, partial(
+                    send_status_change_email.delay,
                     emails,
                     incident.title,
                     incident.rusiem_incident_id,
                     old_status,
                     new_status,
-                    changer_name,
+                    user_name or "Пользователь",
                     f"https://soc.itnovation.pro/incidents/{incident.id}",
-                )
+                ))
         except Exception as e:
             logger.warning(f"Failed to queue status email: {e}")
 
@@ -378,16 +405,11 @@ class IncidentService:
     # ── Update client response ────────────────────────────────────
 
     async def update_client_response(
-        self, incident_id: str, client_response: str, tenant_id: str
-    ) -> PublishedIncident:
-        incident = await self._get_incident(incident_id)
-
-        if str(incident.tenant_id) != tenant_id:
-            raise IncidentServiceError("Доступ запрещён", 403)
-
-        incident.client_response = client_response
-        await self.db.flush()
-        return incident
+        self, incident_id: str, client_response: str, tenant_id: uuid.UUID
+    ) -> uuid.UUID:
+        return await self._update_incident(
+            incident_id, {"client_response": client_response}, tenant_id=tenant_id
+        )
 
     # ── List incidents ────────────────────────────────────────────
 
@@ -401,47 +423,66 @@ class IncidentService:
         page: int = 1,
         per_page: int = 25,
     ) -> dict:
-        query = select(PublishedIncident)
-
+        filters = []
         if tenant_id:
-            query = query.where(PublishedIncident.tenant_id == tenant_id)
+            filters.append(PublishedIncident.tenant_id == tenant_id)
         if status:
-            query = query.where(PublishedIncident.status == status)
+            filters.append(PublishedIncident.status == status)
         if priority:
-            query = query.where(PublishedIncident.priority == priority)
+            filters.append(PublishedIncident.priority == priority)
         if date_from:
-            query = query.where(PublishedIncident.published_at >= date_from)
+            filters.append(PublishedIncident.published_at >= date_from)
         if date_to:
-            query = query.where(PublishedIncident.published_at <= date_to)
-
-        # Count
-        count_q = select(func.count()).select_from(query.subquery())
-        total = (await self.db.execute(count_q)).scalar() or 0
-
-        # Fetch with comment count
-        query = query.order_by(PublishedIncident.published_at.desc())
-        query = query.options(selectinload(PublishedIncident.tenant))
-        query = query.offset((page - 1) * per_page).limit(per_page)
-        result = await self.db.execute(query)
-        incidents = result.scalars().all()
+            filters.append(PublishedIncident.published_at <= date_to)
+
+        # Fetch with comment count in the same statement. A correlated
+        # subquery is only evaluated for the rows on the page, unlike a
+        # JOIN + GROUP BY that aggregates every matching incident first.
+        comments_count = (
+            select(func.count(IncidentComment.id))
+            .where(IncidentComment.incident_id == PublishedIncident.id)
+            .correlate(PublishedIncident)
+            .scalar_subquery()
+        )
+        # The total rides along as a window count over the filtered set, so
+        # the filters are evaluated once instead of in a separate COUNT.
+        query = (
+            select(
+                PublishedIncident,
+                comments_count.label("comments_count"),
+                func.count().over().label("total"),
+            )
+            .where(*filters)
+            .order_by(PublishedIncident.published_at.desc())
+            .options(selectinload(PublishedIncident.tenant))
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+        )
+        rows = (await self.db.execute(query)).all()
+        if rows:
+            total = rows[0].total
+        elif page > 1:
+            # Past the last page there is no row to carry the total
+            count_q = select(func.count(PublishedIncident.id)).where(*filters)
+            total = (await self.db.execute(count_q)).scalar() or 0
+        else:
+            total = 0
 
         items = []
-        for inc in incidents:
-            # Count comments
-            cc = await self.db.execute(
-                select(func.count()).where(IncidentComment.incident_id == inc.id)
-            )
+        for inc, comments_count, _ in rows:
+            # UUIDs and datetimes are left as-is; the list endpoints hand
+            # this straight to orjson, which encodes them natively.
             items.append({
-                "id": str(inc.id),
+                "id": inc.id,
                 "rusiem_incident_id": inc.rusiem_incident_id,
                 "title": inc.title,
                 "priority": inc.priority,
                 "status": inc.status,
                 "category": inc.category,
                 "tenant_name": inc.tenant.short_name if inc.tenant else "",
-                "published_at": inc.published_at.isoformat() if inc.published_at else None,
-                "updated_at": inc.updated_at.isoformat() if inc.updated_at else None,
-                "comments_count": cc.scalar() or 0,
+                "published_at": inc.published_at,
+                "updated_at": inc.updated_at,
+                "comments_count": comments_count,
             })
 
         return {
@@ -454,16 +495,37 @@ class IncidentService:
     # ── Get incident detail ───────────────────────────────────────
 
     async def get_incident_detail(
-        self, incident_id: str, tenant_id: str | None = None
+        self, incident_id: str, tenant_id: uuid.UUID | None = None
     ) -> dict:
+        # Only the columns rendered below are fetched: the raw RuSIEM payload
+        # stays on the server, and related users contribute just their name.
+        # To-one users ride on the main row; each collection is one IN query.
+        # Publisher and comment/history authors are NOT NULL FKs, so those
+        # joins are inner joins.
+        user_name = load_only(User.name)
         result = await self.db.execute(
             select(PublishedIncident)
             .options(
-                selectinload(PublishedIncident.comments).selectinload(IncidentComment.user),
-                selectinload(PublishedIncident.status_history).selectinload(IncidentStatusChange.user),
-                selectinload(PublishedIncident.publisher),
-                selectinload(PublishedIncident.closer),
-                selectinload(PublishedIncident.acknowledger),
+                load_only(
+                    PublishedIncident.tenant_id, PublishedIncident.rusiem_incident_id,
+                    PublishedIncident.title, PublishedIncident.description,
+                    PublishedIncident.priority, PublishedIncident.category,
+                    PublishedIncident.mitre_id, PublishedIncident.source_ips,
+                    PublishedIncident.source_hostnames, PublishedIncident.event_source_ips,
+                    PublishedIncident.event_count, PublishedIncident.symptoms,
+                    PublishedIncident.rusiem_created_at, PublishedIncident.status,
+                    PublishedIncident.recommendations, PublishedIncident.soc_actions,
+                    PublishedIncident.client_response, PublishedIncident.ioc_indicators,
+                    PublishedIncident.affected_assets, PublishedIncident.acknowledged_at,
+                    PublishedIncident.published_at, PublishedIncident.closed_at,
+                ),
+                joinedload(PublishedIncident.publisher, innerjoin=True).options(user_name),
+                joinedload(PublishedIncident.closer).options(user_name),
+                joinedload(PublishedIncident.acknowledger).options(user_name),
+                selectinload(PublishedIncident.comments)
+                .joinedload(IncidentComment.user, innerjoin=True).options(user_name),
+                selectinload(PublishedIncident.status_history)
+                .joinedload(IncidentStatusChange.user, innerjoin=True).options(user_name),
             )
             .where(PublishedIncident.id == incident_id)
         )
@@ -472,7 +534,7 @@ class IncidentService:
             raise IncidentServiceError("Инцидент не найден", 404)
 
         # Client can only view their own
-        if tenant_id and str(incident.tenant_id) != tenant_id:
+        if tenant_id and incident.tenant_id != tenant_id:
             raise IncidentServiceError("Доступ запрещён", 403)
 
         return {
@@ -525,34 +587,145 @@ class IncidentService:
         }
 
     async def acknowledge_incident(
-        self, incident_id: str, user_id: str, tenant_id: str | None = None
+        self, incident_id: str, user_id: uuid.UUID, tenant_id: uuid.UUID | None = None
     ) -> dict:
         """Client acknowledges the incident."""
-        incident = await self._get_incident(incident_id)
-        if tenant_id and str(incident.tenant_id) != tenant_id:
-            raise IncidentServiceError("Доступ запрещён", 403)
-        if incident.acknowledged_at:
+        acknowledged_at = datetime.now(timezone.utc)
+        stmt = (
+            update(PublishedIncident)
+            .where(
+                PublishedIncident.id == incident_id,
+                PublishedIncident.acknowledged_at.is_(None),
+            )
+            .values(acknowledged_at=acknowledged_at, acknowledged_by=user_id)
+            .returning(PublishedIncident.id)
+        )
+        if tenant_id:
+            stmt = stmt.where(PublishedIncident.tenant_id == tenant_id)
+        if (await self.db.execute(stmt)).scalar_one_or_none() is None:
+            incident = await self._get_incident(incident_id)
+            if tenant_id and incident.tenant_id != tenant_id:
+                raise IncidentServiceError("Доступ запрещён", 403)
             raise IncidentServiceError("Инцидент уже подтверждён")
-
-        incident.acknowledged_at = datetime.now(timezone.utc)
-        incident.acknowledged_by = uuid.UUID(user_id)
-        await self.db.flush()
-        return {"acknowledged_at": incident.acknowledged_at.isoformat()}
+        return {"acknowledged_at": acknowledged_at.isoformat()}
 
     async def update_ioc_assets(
         self, incident_id: str, ioc_indicators: list | None = None, affected_assets: list | None = None
     ) -> dict:
         """SOC updates IOC indicators and affected assets."""
-        incident = await self._get_incident(incident_id)
+        values = {}
         if ioc_indicators is not None:
-            incident.ioc_indicators = ioc_indicators
+            values["ioc_indicators"] = ioc_indicators
         if affected_assets is not None:
-            incident.affected_assets = affected_assets
-        await self.db.flush()
+            values["affected_assets"] = affected_assets
+        await self._update_incident(incident_id, values)
         return {"ok": True}
 
+    # ── Bulk operations ───────────────────────────────────────────
+
+    async def bulk_acknowledge(
+        self, incident_ids: list[uuid.UUID], user_id: uuid.UUID, tenant_id: uuid.UUID
+    ) -> dict:
+        """Client acknowledges several incidents in one UPDATE.
+
+        Incidents that are foreign, missing or already acknowledged are
+        skipped by the WHERE clause and reported back instead of failing
+        the whole batch.
+        """
+        acknowledged_at = datetime.now(timezone.utc)
+        result = await self.db.execute(
+            update(PublishedIncident)
+            .where(
+                PublishedIncident.id.in_(incident_ids),
+                PublishedIncident.tenant_id == tenant_id,
+                PublishedIncident.acknowledged_at.is_(None),
+            )
+            .values(acknowledged_at=acknowledged_at, acknowledged_by=user_id)
+            .returning(PublishedIncident.id, PublishedIncident.title)
+        )
+        rows = result.all()
+        if rows:
+            await self.db.execute(insert(Notification), [{
+                "tenant_id": tenant_id,
+                "type": "incident_acknowledged",
+                "title": f"Incident acknowledged: {title[:100]}",
+                "message": f"Client acknowledged incident '{title[:80]}'.",
+                "extra_data": {"incident_id": str(incident_id)},
+            } for incident_id, title in rows])
+            after_commit(self.db, partial(write_audit_log, [{
+                "tenant_id": tenant_id,
+                "user_id": user_id,
+                "action": "incident_acknowledged",
+                "resource_type": "incident",
+                "resource_id": str(incident_id),
+            } for incident_id, _ in rows]))
+
+        acknowledged = [str(incident_id) for incident_id, _ in rows]
+        return {
+            "acknowledged": acknowledged,
+            "skipped": len(set(incident_ids)) - len(acknowledged),
+            "acknowledged_at": acknowledged_at.isoformat(),
+        }
+
+    async def bulk_update_ioc_assets(
+        self,
+        incident_ids: list[uuid.UUID],
+        user_id: uuid.UUID,
+        ioc_indicators: list | None = None,
+        affected_assets: list | None = None,
+    ) -> dict:
+        """SOC sets the same IOC indicators / affected assets on several incidents."""
+        values = {}
+        if ioc_indicators is not None:
+            values["ioc_indicators"] = ioc_indicators
+        if affected_assets is not None:
+            values["affected_assets"] = affected_assets
+        if not values or not incident_ids:
+            return {"updated": []}
+
+        result = await self.db.execute(
+            update(PublishedIncident)
+            .where(PublishedIncident.id.in_(incident_ids))
+            .values(**values)
+            .returning(PublishedIncident.id, PublishedIncident.tenant_id)
+        )
+        rows = result.all()
+        after_commit(self.db, partial(write_audit_log, [{
+            "tenant_id": tenant_id,
+            "user_id": user_id,
+            "action": "incident_ioc_updated",
+            "resource_type": "incident",
+            "resource_id": str(incident_id),
+            "details": {"fields": sorted(values)},
+        } for incident_id, tenant_id in rows]))
+        return {"updated": [str(incident_id) for incident_id, _ in rows]}
+
     # ── Helpers ───────────────────────────────────────────────────
 
+    async def _update_incident(
+        self, incident_id: str, values: dict, tenant_id: uuid.UUID | None = None
+    ) -> uuid.UUID:
+        """UPDATE columns in place without loading the row.
+
+        The ownership check is part of the WHERE clause; the row is only
+        read back to tell 404 from 403 when nothing was updated.
+        """
+        if not values:
+            return (await self._get_incident(incident_id)).id
+        stmt = (
+            update(PublishedIncident)
+            .where(PublishedIncident.id == incident_id)
+            .values(**values)
+            .returning(PublishedIncident.id)
+        )
+        if tenant_id:
+            stmt = stmt.where(PublishedIncident.tenant_id == tenant_id)
+        updated_id = (await self.db.execute(stmt)).scalar_one_or_none()
+        if updated_id is None:
+            await self._get_incident(incident_id)
+            raise IncidentServiceError("Доступ запрещён", 403)
+        return updated_id
+
     async def _get_incident(self, incident_id: str) -> PublishedIncident:
         result = await self.db.execute(
             select(PublishedIncident).where(PublishedIncident.id == incident_id)
@@ -562,13 +735,17 @@ class IncidentService:
             raise IncidentServiceError("Инцидент не найден", 404)
         return incident
 
-    async def _get_tenant_emails(self, tenant_id: str) -> list[str]:
+    async def _get_tenant_emails(self, tenant_id: uuid.UUID) -> list[str]:
         """Get email addresses of active client users for a tenant."""
-        result = await self.db.execute(
+        if tenant_id in self._tenant_emails:
+            return self._tenant_emails[tenant_id]
+        result = await self.db.scalars(
             select(User.email).where(
-                User.tenant_id == uuid.UUID(tenant_id),
+                User.tenant_id == tenant_id,
                 User.is_active == True,  # noqa: E712
                 User.role.in_(["client_admin", "client_security"]),
             )
         )
-        return [row[0] for row in result.all()]
+        emails = list(result.all())
+        self._tenant_emails[tenant_id] = emails
+        return emails
@@ -12,11 +12,17 @@ Status logic:
 - unknown:   newly added, not yet checked
 """
 
+import asyncio
+import json
 import logging
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select, func, or_
+import redis.asyncio as aioredis
+from sqlalchemy import (
+    Float, Row, String, case, cast, column, func, lambda_stmt, literal, or_, select, tuple_, update, values,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.models import LogSource, Tenant
@@ -28,6 +34,21 @@ logger = logging.getLogger(__name__)
 NO_LOGS_THRESHOLD_MINUTES = 30
 DEGRADED_THRESHOLD_MINUTES = 120  # 2 hours
 
+SOURCE_STATUSES = ("active", "degraded", "no_logs", "error", "unknown")
+
+# Dashboard widget stats only change on the periodic status sync
+STATS_CACHE_TTL = 30
+
+# Concurrent RuSIEM event searches per tenant during status sync
+PROBE_CONCURRENCY = 10
+
+# Columns rendered by list views; selected as plain rows, no ORM hydration
+_LIST_COLUMNS = (
+    LogSource.id, LogSource.tenant_id, LogSource.name, LogSource.source_type,
+    LogSource.host, LogSource.vendor, LogSource.product, LogSource.rusiem_group_name,
+    LogSource.status, LogSource.last_event_at, LogSource.eps, LogSource.created_at,
+)
+
 
 class LogSourceServiceError(Exception):
     def __init__(self, status_code: int, detail: str):
@@ -37,8 +58,9 @@ class LogSourceServiceError(Exception):
 
 
 class LogSourceService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, redis_client: aioredis.Redis | None = None):
         self.db = db
+        self.redis = redis_client
 
     # ── List (client view) ────────────────────────────────────────
 
@@ -50,20 +72,22 @@ class LogSourceService:
         source_type: str | None = None,
     ) -> list[dict]:
         """List log sources for a tenant with optional filters."""
-        query = (
-            select(LogSource)
+        # lambda_stmt caches the built statement and its SQL per filter
+        # combination; only the bound values change between calls.
+        query = lambda_stmt(
+            lambda: select(*_LIST_COLUMNS)
             .where(LogSource.tenant_id == tenant_id, LogSource.is_active == True)  # noqa: E712
         )
 
         if status:
-            query = query.where(LogSource.status == status)
+            query += lambda q: q.where(LogSource.status == status)
 
         if source_type:
-            query = query.where(LogSource.source_type == source_type)
+            query += lambda q: q.where(LogSource.source_type == source_type)
 
         if search:
             pattern = f"%{search}%"
-            query = query.where(
+            query += lambda q: q.where(
                 or_(
                     LogSource.name.ilike(pattern),
                     LogSource.host.ilike(pattern),
@@ -72,38 +96,39 @@ class LogSourceService:
                 )
             )
 
-        query = query.order_by(LogSource.name)
+        query += lambda q: q.order_by(LogSource.name)
         result = await self.db.execute(query)
-        sources = result.scalars().all()
-
-        return [self._to_dict(s) for s in sources]
+        return [self._to_dict(row) for row in result.all()]
 
     # ── Stats (for dashboard widget) ──────────────────────────────
 
     async def get_stats(self, tenant_id: str) -> dict:
-        """Source status statistics for a tenant."""
-        query = (
-            select(
-                func.count().label("total"),
-                func.count().filter(LogSource.status == "active").label("active"),
-                func.count().filter(LogSource.status == "degraded").label("degraded"),
-                func.count().filter(LogSource.status == "no_logs").label("no_logs"),
-                func.count().filter(LogSource.status == "error").label("error"),
-                func.count().filter(LogSource.status == "unknown").label("unknown"),
-            )
+        """Source status statistics for a tenant (cached in Redis when available)."""
+        cache_key = f"logsrc:stats:{tenant_id}"
+        if self.redis:
+            try:
+                cached = await self.redis.get(cache_key)
+                if cached:
+                    return json.loads(cached)
+            except Exception as e:
+                logger.warning(f"Stats cache read failed: {e}")
+
+        result = await self.db.execute(lambda_stmt(
+            lambda: select(LogSource.status, func.count())
             .where(LogSource.tenant_id == tenant_id, LogSource.is_active == True)  # noqa: E712
-        )
-        result = await self.db.execute(query)
-        row = result.one()
-
-        return {
-            "total": row.total,
-            "active": row.active,
-            "degraded": row.degraded,
-            "no_logs": row.no_logs,
-            "error": row.error,
-            "unknown": row.unknown,
-        }
+            .group_by(LogSource.status)
+        ))
+        stats = dict.fromkeys(("total", *SOURCE_STATUSES), 0)
+        for status, count in result.all():
+            stats[status] = count
+            stats["total"] += count
+
+        if self.redis:
+            try:
+                await self.redis.setex(cache_key, STATS_CACHE_TTL, json.dumps(stats))
+            except Exception as e:
+                logger.warning(f"Stats cache write failed: {e}")
+        return stats
 
     # ── Get source types (for filter dropdown) ────────────────────
 
@@ -135,29 +160,31 @@ class LogSourceService:
         if not tenant:
             raise LogSourceServiceError(404, "Клиент не найден")
 
-        # Check for duplicate host in the same tenant
-        existing = await self.db.execute(
-            select(LogSource).where(
-                LogSource.tenant_id == tenant_id,
-                LogSource.host == host,
-                LogSource.is_active == True,  # noqa: E712
+        # Duplicate host in the same tenant is caught by the partial unique
+        # index (migration 010) in the same round trip as the insert
+        stmt = (
+            pg_insert(LogSource)
+            .on_conflict_do_nothing(
+                index_elements=["tenant_id", "host"],
+                index_where=LogSource.is_active,
             )
+            .returning(LogSource)
         )
-        if existing.scalar_one_or_none():
+        result = await self.db.scalars(stmt, [{
+            "id": uuid.uuid4(),
+            "tenant_id": uuid.UUID(tenant_id),
+            "name": name,
+            "source_type": source_type,
+            "host": host,
+            "vendor": vendor,
+            "product": product,
+            "rusiem_group_name": rusiem_group_name,
+            "status": "unknown",
+        }])
+        source = result.one_or_none()
+        if source is None:
             raise LogSourceServiceError(409, f"Источник с хостом {host} уже существует для данного клиента")
-
-        source = LogSource(
-            tenant_id=uuid.UUID(tenant_id),
-            name=name,
-            source_type=source_type,
-            host=host,
-            vendor=vendor,
-            product=product,
-            rusiem_group_name=rusiem_group_name,
-            status="unknown",
-        )
-        self.db.add(source)
-        await self.db.flush()
+        await self._invalidate_stats(tenant_id)
         return source
 
     async def update_source(
@@ -170,6 +197,21 @@ class LogSourceService:
         if not source:
             raise LogSourceServiceError(404, "Источник не найден")
 
+        # The partial unique index covers updates too; report a host taken by
+        # another active source of the tenant as 409 rather than a failed flush
+        host = fields.get("host")
+        if host is not None and host != source.host and source.is_active:
+            conflict = await self.db.scalar(
+                select(LogSource.id).where(
+                    LogSource.tenant_id == source.tenant_id,
+                    LogSource.host == host,
+                    LogSource.is_active == True,  # noqa: E712
+                    LogSource.id != source.id,
+                )
+            )
+            if conflict is not None:
+                raise LogSourceServiceError(409, f"Источник с хостом {host} уже существует для данного клиента")
+
         allowed = {"name", "source_type", "host", "vendor", "product", "rusiem_group_name"}
         for key, value in fields.items():
             if key in allowed and value is not None:
@@ -186,6 +228,7 @@ class LogSourceService:
 
         source.is_active = False
         await self.db.flush()
+        await self._invalidate_stats(str(source.tenant_id))
         return {"ok": True, "id": str(source.id)}
 
     # ── List all (SOC cross-tenant view) ──────────────────────────
@@ -197,89 +240,171 @@ class LogSourceService:
         search: str | None = None,
         page: int = 1,
         per_page: int = 50,
+        after_name: str | None = None,
+        after_id: uuid.UUID | None = None,
     ) -> dict:
-        """List all sources across tenants (SOC view)."""
-        query = select(LogSource).where(LogSource.is_active == True)  # noqa: E712
+        """List all sources across tenants (SOC view).
 
+        Pass ``after_name``/``after_id`` from the previous page's
+        ``next_cursor`` for keyset pagination; ``page`` is then ignored.
+        """
+        filters = [LogSource.is_active == True]  # noqa: E712
         if tenant_id:
-            query = query.where(LogSource.tenant_id == tenant_id)
+            filters.append(LogSource.tenant_id == tenant_id)
         if status:
-            query = query.where(LogSource.status == status)
+            filters.append(LogSource.status == status)
         if search:
             pattern = f"%{search}%"
-            query = query.where(
+            filters.append(
                 or_(
                     LogSource.name.ilike(pattern),
                     LogSource.host.ilike(pattern),
                 )
             )
 
-        # Count
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await self.db.execute(count_query)).scalar() or 0
+        query = select(*_LIST_COLUMNS).where(*filters).order_by(LogSource.name, LogSource.id).limit(per_page)
+        # Paginate: keyset when a cursor is given, OFFSET otherwise
+        keyset = after_name is not None and after_id is not None
+        if keyset:
+            query = query.where(tuple_(LogSource.name, LogSource.id) > (after_name, after_id))
+        else:
+            # Total rides along on every row instead of a second COUNT query
+            query = query.add_columns(func.count().over().label("total")).offset((page - 1) * per_page)
+        rows = (await self.db.execute(query)).all()
+
+        if rows and not keyset:
+            total = rows[0].total
+        elif keyset or page > 1:
+            # The cursor predicate narrows the window, and past the last
+            # page there is no row to carry the total
+            count_q = select(func.count(LogSource.id)).where(*filters)
+            total = (await self.db.execute(count_q)).scalar() or 0
+        else:
+            total = 0
 
-        # Paginate
-        query = query.order_by(LogSource.name).offset((page - 1) * per_page).limit(per_page)
-        result = await self.db.execute(query)
-        sources = result.scalars().all()
+        next_cursor = None
+        if len(rows) == per_page:
+            next_cursor = {"after_name": rows[-1].name, "after_id": str(rows[-1].id)}
 
         return {
-            "items": [self._to_dict(s, include_tenant=True) for s in sources],
+            "items": [self._to_dict(row, include_tenant=True) for row in rows],
             "total": total,
             "page": page,
             "pages": (total + per_page - 1) // per_page,
+            "next_cursor": next_cursor,
         }
 
     # ── Status sync logic ─────────────────────────────────────────
 
+    async def load_hosts(self, tenant_id) -> list[Row]:
+        """Active sources of a tenant as (id, name, host, status, last_event_at).
+
+        The sync loads these once to probe RuSIEM per host and hands the
+        same rows to ``update_statuses_for_tenant``.
+        """
+        result = await self.db.execute(
+            select(LogSource.id, LogSource.name, LogSource.host, LogSource.status, LogSource.last_event_at)
+            .where(
+                LogSource.tenant_id == tenant_id,
+                LogSource.is_active == True,  # noqa: E712
+            )
+        )
+        return result.all()
+
+    @staticmethod
+    async def probe_last_events(rusiem, hosts, concurrency: int = PROBE_CONCURRENCY) -> dict[str, datetime | None]:
+        """Latest RuSIEM event time per host (None if none or on error).
+
+        Hosts are queried concurrently, at most ``concurrency`` at a time,
+        over the client's shared connection pool.
+        """
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _probe(host: str) -> tuple[str, datetime | None]:
+            try:
+                async with sem:
+                    events = await rusiem.search_events(query=f"host:{host}", interval="5m", limit=1)
+                event_data = events.get("data", [])
+                ts = event_data and (event_data[0].get("timestamp") or event_data[0].get("@timestamp"))
+                if not ts:
+                    return host, None
+                if isinstance(ts, str):
+                    # fromisoformat takes the trailing "Z" itself since 3.11
+                    return host, datetime.fromisoformat(ts)
+                return host, datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+            except Exception as e:
+                logger.warning(f"Source check failed for {host}: {e}")
+                return host, None
+
+        return dict(await asyncio.gather(*(_probe(h) for h in hosts)))
+
     async def update_statuses_for_tenant(
         self,
         tenant_id: str,
         source_events: dict[str, datetime | None],
+        sources: list[Row] | None = None,
     ) -> int:
         """Update source statuses based on last event timestamps.
 
         Args:
             tenant_id: Tenant UUID
             source_events: dict of {host: last_event_datetime_or_None}
+            sources: rows from ``load_hosts``, if the caller already has them
 
         Returns:
             Number of sources updated
         """
         now = datetime.now(timezone.utc)
-        updated = 0
+        active_since = now - timedelta(minutes=NO_LOGS_THRESHOLD_MINUTES)
+        degraded_since = now - timedelta(minutes=DEGRADED_THRESHOLD_MINUTES)
 
-        result = await self.db.execute(
-            select(LogSource).where(
-                LogSource.tenant_id == tenant_id,
-                LogSource.is_active == True,  # noqa: E712
-            )
-        )
-        sources = result.scalars().all()
+        if sources is None:
+            sources = await self.load_hosts(tenant_id)
 
+        # id -> (new status, new last_event_at) for rows that actually change
+        changes: dict[uuid.UUID, tuple[str, datetime | None]] = {}
+        updated = 0
         for source in sources:
             last_event = source_events.get(source.host)
-            old_status = source.status
 
             if last_event is None:
                 # No events found for this source
                 if source.last_event_at:
                     # Had events before — check how long ago
-                    new_status = self._compute_status(source.last_event_at, now)
+                    new_status = self._compute_status(source.last_event_at, active_since, degraded_since)
                 else:
                     new_status = "no_logs"
+                last_event = source.last_event_at
             else:
-                source.last_event_at = last_event
-                new_status = self._compute_status(last_event, now)
+                new_status = self._compute_status(last_event, active_since, degraded_since)
 
-            if new_status != old_status:
-                source.status = new_status
+            if new_status != source.status:
                 updated += 1
                 logger.info(
-                    f"Source {source.name} ({source.host}): {old_status} → {new_status}"
+                    f"Source {source.name} ({source.host}): {source.status} → {new_status}"
+                )
+            if new_status != source.status or last_event != source.last_event_at:
+                changes[source.id] = (new_status, last_event)
+
+        if changes:
+            # One UPDATE ... SET col = CASE id WHEN ... END for all changed rows
+            await self.db.execute(
+                update(LogSource)
+                .where(LogSource.id.in_(changes))
+                .values(
+                    status=case(
+                        {sid: st for sid, (st, _) in changes.items()},
+                        value=LogSource.id,
+                    ),
+                    last_event_at=case(
+                        {sid: literal(ts, LogSource.last_event_at.type) for sid, (_, ts) in changes.items()},
+                        value=LogSource.id,
+                    ),
                 )
+                .execution_options(synchronize_session=False)
+            )
 
-        await self.db.flush()
+        await self._invalidate_stats(tenant_id)
         return updated
 
     async def auto_import_sources(
@@ -355,6 +480,7 @@ class LogSourceService:
 
         if created:
             await self.db.flush()
+            await self._invalidate_stats(tenant_id)
         return created
 
     async def bulk_update_eps(
@@ -362,42 +488,56 @@ class LogSourceService:
         tenant_id: str,
         source_eps: dict[str, float],
     ):
-        """Update EPS values for sources."""
-        result = await self.db.execute(
-            select(LogSource).where(
+        """Update EPS values for sources in one UPDATE ... FROM (VALUES ...)."""
+        if not source_eps:
+            return
+        eps_values = values(
+            column("host", String), column("eps", Float), name="v",
+        ).data(list(source_eps.items()))
+        await self.db.execute(
+            update(LogSource)
+            .where(
                 LogSource.tenant_id == tenant_id,
                 LogSource.is_active == True,  # noqa: E712
+                LogSource.host == eps_values.c.host,
             )
+            # VALUES params reach Postgres untyped; cast so eps isn't text
+            .values(eps=cast(eps_values.c.eps, Float))
+            .execution_options(synchronize_session=False)
         )
-        sources = result.scalars().all()
-
-        for source in sources:
-            eps = source_eps.get(source.host)
-            if eps is not None:
-                source.eps = eps
-
-        await self.db.flush()
+        await self._invalidate_stats(tenant_id)
 
     # ── Private helpers ───────────────────────────────────────────
 
+    async def _invalidate_stats(self, tenant_id: str) -> None:
+        if not self.redis:
+            return
+        try:
+            await self.redis.delete(f"logsrc:stats:{tenant_id}")
+        except Exception as e:
+            logger.warning(f"Stats cache invalidation failed: {e}")
+
     @staticmethod
-    def _compute_status(last_event_at: datetime, now: datetime) -> str:
-        """Determine source status based on last event timestamp."""
+    def _compute_status(last_event_at: datetime, active_since: datetime, degraded_since: datetime) -> str:
+        """Determine source status based on last event timestamp.
+
+        ``active_since``/``degraded_since`` are the threshold cut-offs,
+        computed once per sync so each source costs two comparisons.
+        """
         if last_event_at.tzinfo is None:
             last_event_at = last_event_at.replace(tzinfo=timezone.utc)
 
-        delta = now - last_event_at
-        minutes = delta.total_seconds() / 60
-
-        if minutes <= NO_LOGS_THRESHOLD_MINUTES:
+        if last_event_at >= active_since:
             return "active"
-        elif minutes <= DEGRADED_THRESHOLD_MINUTES:
+        elif last_event_at >= degraded_since:
             return "degraded"
         else:
             return "no_logs"
 
     @staticmethod
-    def _to_dict(source: LogSource, include_tenant: bool = False) -> dict:
+    def _to_dict(source: LogSource | Row, include_tenant: bool = False) -> dict:
+        # Datetimes are left as-is: list endpoints return ORJSONResponse,
+        # which serializes them natively instead of per-row isoformat().
         d = {
             "id": str(source.id),
             "name": source.name,
@@ -407,9 +547,9 @@ class LogSourceService:
             "product": source.product,
             "rusiem_group_name": source.rusiem_group_name,
             "status": source.status,
-            "last_event_at": source.last_event_at.isoformat() if source.last_event_at else None,
+            "last_event_at": source.last_event_at,
             "eps": source.eps,
-            "created_at": source.created_at.isoformat() if source.created_at else None,
+            "created_at": source.created_at,
         }
         if include_tenant:
             d["tenant_id"] = str(source.tenant_id)
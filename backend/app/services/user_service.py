@@ -6,12 +6,16 @@ Used by SOC admins to create/manage users for tenants and SOC staff.
 
 import logging
 import uuid
+from functools import partial
+from operator import attrgetter
 
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import hash_password
-from app.models.models import User, Tenant, AuditLog
+from app.core.database import after_commit
+from app.core.security import hash_password_async
+from app.models.models import User, Tenant
+from app.services.audit_service import write_audit_log
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +23,12 @@ SOC_ROLES = ("soc_admin", "soc_analyst")
 CLIENT_ROLES = ("client_admin", "client_security", "client_auditor", "client_readonly")
 ALL_ROLES = SOC_ROLES + CLIENT_ROLES
 
+_USER_FIELDS = (
+    "id", "email", "name", "role", "tenant_id",
+    "mfa_enabled", "is_active", "last_login", "created_at",
+)
+_user_attrs = attrgetter(*_USER_FIELDS)
+
 
 class UserServiceError(Exception):
     def __init__(self, detail: str, status_code: int = 400):
@@ -26,6 +36,16 @@ class UserServiceError(Exception):
         self.status_code = status_code
 
 
+def _opt_uuid(value: str | None) -> uuid.UUID | None:
+    """Parse an optional id once at the service boundary."""
+    if not value:
+        return None
+    try:
+        return uuid.UUID(value)
+    except ValueError:
+        raise UserServiceError(f"Некорректный идентификатор: {value}")
+
+
 class UserService:
     def __init__(self, db: AsyncSession):
         self.db = db
@@ -59,6 +79,9 @@ class UserService:
         if len(password) < 12:
             raise UserServiceError("Пароль должен содержать минимум 12 символов")
 
+        parsed_tenant_id = _opt_uuid(tenant_id)
+        parsed_created_by_id = _opt_uuid(created_by_id)
+
         # Check email uniqueness
         existing = await self.db.execute(
             select(User).where(User.email == email)
@@ -67,34 +90,35 @@ class UserService:
             raise UserServiceError(f"Пользователь с email {email} уже существует")
 
         # Verify tenant exists
-        if tenant_id:
+        if parsed_tenant_id:
             tenant = await self.db.execute(
-                select(Tenant).where(Tenant.id == tenant_id)
+                select(Tenant).where(Tenant.id == parsed_tenant_id)
             )
             if not tenant.scalar_one_or_none():
                 raise UserServiceError(f"Клиент {tenant_id} не найден")
 
+        # id is generated here so the audit entry can reference it without a
+        # flush; the row itself is written by the request's commit.
         user = User(
+            id=uuid.uuid4(),
             email=email,
             name=name,
-            password_hash=hash_password(password),
+            password_hash=await hash_password_async(password),
             role=role,
-            tenant_id=uuid.UUID(tenant_id) if tenant_id else None,
+            tenant_id=parsed_tenant_id,
         )
         self.db.add(user)
-        await self.db.flush()
 
         # Audit
-        if created_by_id:
-            self.db.add(AuditLog(
-                tenant_id=user.tenant_id,
-                user_id=uuid.UUID(created_by_id),
-                action="user_created",
-                resource_type="user",
-                resource_id=str(user.id),
-                details={"email": email, "role": role},
-            ))
-            await self.db.flush()
+        if parsed_created_by_id:
+            after_commit(self.db, partial(write_audit_log, {
+                "tenant_id": user.tenant_id,
+                "user_id": parsed_created_by_id,
+                "action": "user_created",
+                "resource_type": "user",
+                "resource_id": str(user.id),
+                "details": {"email": email, "role": role},
+            }))
 
         logger.info(f"User created: {email} ({role})")
         return user
@@ -107,25 +131,30 @@ class UserService:
         per_page: int = 25,
     ) -> dict:
         """List users with optional filters."""
-        query = select(User).where(User.is_active == True)  # noqa: E712
-
+        filters = [User.is_active == True]  # noqa: E712
         if tenant_id:
-            query = query.where(User.tenant_id == tenant_id)
+            filters.append(User.tenant_id == _opt_uuid(tenant_id))
         if role:
-            query = query.where(User.role == role)
-
-        # Count
-        count_query = select(func.count()).select_from(query.subquery())
-        total = (await self.db.execute(count_query)).scalar() or 0
-
-        # Paginate
-        query = query.order_by(User.created_at.desc())
-        query = query.offset((page - 1) * per_page).limit(per_page)
+            filters.append(User.role == role)
+
+        # Count straight off the table rather than wrapping the row select
+        total = (await self.db.execute(
+            select(func.count()).select_from(User).where(*filters)
+        )).scalar() or 0
+
+        # Paginate; only the serialized columns, no ORM instances
+        query = (
+            select(*(getattr(User, f) for f in _USER_FIELDS))
+            .where(*filters)
+            .order_by(User.created_at.desc())
+            .offset((page - 1) * per_page)
+            .limit(per_page)
+        )
         result = await self.db.execute(query)
-        users = result.scalars().all()
+        to_dict = self._user_to_dict
 
         return {
-            "items": [self._user_to_dict(u) for u in users],
+            "items": [to_dict(row) for row in result],
             "total": total,
             "page": page,
             "pages": (total + per_page - 1) // per_page,
@@ -139,21 +168,20 @@ class UserService:
 
     async def deactivate_user(self, user_id: str, deactivated_by_id: str) -> dict:
         """Soft-delete user."""
+        parsed_by_id = _opt_uuid(deactivated_by_id)
         user = await self.get_user(user_id)
         if not user:
             raise UserServiceError("Пользователь не найден", 404)
 
         user.is_active = False
-        await self.db.flush()
 
-        self.db.add(AuditLog(
-            tenant_id=user.tenant_id,
-            user_id=uuid.UUID(deactivated_by_id),
-            action="user_deactivated",
-            resource_type="user",
-            resource_id=str(user.id),
-        ))
-        await self.db.flush()
+        after_commit(self.db, partial(write_audit_log, {
+            "tenant_id": user.tenant_id,
+            "user_id": parsed_by_id,
+            "action": "user_deactivated",
+            "resource_type": "user",
+            "resource_id": str(user.id),
+        }))
 
         return {"ok": True}
 
@@ -163,6 +191,7 @@ class UserService:
         tenant_id: str | None = None, is_active: bool | None = None,
     ) -> dict:
         """Update user fields."""
+        parsed_by_id = _opt_uuid(updated_by_id)
         user = await self.get_user(user_id)
         if not user:
             raise UserServiceError("Пользователь не найден", 404)
@@ -175,20 +204,17 @@ class UserService:
                 raise UserServiceError(f"Недопустимая роль: {role}")
             user.role = role
         if tenant_id is not None:
-            user.tenant_id = uuid.UUID(tenant_id) if tenant_id else None
+            user.tenant_id = _opt_uuid(tenant_id)
         if is_active is not None:
             user.is_active = is_active
 
-        await self.db.flush()
-
-        self.db.add(AuditLog(
-            tenant_id=user.tenant_id,
-            user_id=uuid.UUID(updated_by_id),
-            action="user_updated",
-            resource_type="user",
-            resource_id=str(user.id),
-        ))
-        await self.db.flush()
+        after_commit(self.db, partial(write_audit_log, {
+            "tenant_id": user.tenant_id,
+            "user_id": parsed_by_id,
+            "action": "user_updated",
+            "resource_type": "user",
+            "resource_id": str(user.id),
+        }))
 
         return self._user_to_dict(user)
 
@@ -197,38 +223,40 @@ class UserService:
         if len(new_password) < 12:
             raise UserServiceError("Пароль должен содержать минимум 12 символов")
 
+        parsed_by_id = _opt_uuid(reset_by_id)
         user = await self.get_user(user_id)
         if not user:
             raise UserServiceError("Пользователь не найден", 404)
 
-        user.password_hash = hash_password(new_password)
+        user.password_hash = await hash_password_async(new_password)
         user.mfa_enabled = False  # Force MFA re-setup after reset
         user.mfa_secret = None
         user.otp_code = None
         user.otp_expires_at = None
-        await self.db.flush()
 
-        self.db.add(AuditLog(
-            tenant_id=user.tenant_id,
-            user_id=uuid.UUID(reset_by_id),
-            action="password_reset_by_admin",
-            resource_type="user",
-            resource_id=str(user.id),
-        ))
-        await self.db.flush()
+        after_commit(self.db, partial(write_audit_log, {
+            "tenant_id": user.tenant_id,
+            "user_id": parsed_by_id,
+            "action": "password_reset_by_admin",
+            "resource_type": "user",
+            "resource_id": str(user.id),
+        }))
 
         return {"ok": True}
 
     @staticmethod
-    def _user_to_dict(user: User) -> dict:
+    def _user_to_dict(user) -> dict:
+        """Serialize a User or a row of its _USER_FIELDS columns."""
+        (user_id, email, name, role, tenant_id,
+         mfa_enabled, is_active, last_login, created_at) = _user_attrs(user)
         return {
-            "id": str(user.id),
-            "email": user.email,
-            "name": user.name,
-            "role": user.role,
-            "tenant_id": str(user.tenant_id) if user.tenant_id else None,
-            "mfa_enabled": user.mfa_enabled,
-            "is_active": user.is_active,
-            "last_login": user.last_login.isoformat() if user.last_login else None,
-            "created_at": user.created_at.isoformat() if user.created_at else None,
+            "id": str(user_id),
+            "email": email,
+            "name": name,
+            "role": role,
+            "tenant_id": str(tenant_id) if tenant_id else None,
+            "mfa_enabled": mfa_enabled,
+            "is_active": is_active,
+            "last_login": last_login.isoformat() if last_login else None,
+            "created_at": created_at.isoformat() if created_at else None,
         }
@@ -5,17 +5,33 @@ Tasks:
 - sla_calculator: runs hourly, computes MTTA/MTTR per tenant
 """
 
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 
+import redis.asyncio as aioredis
 from celery import Celery
 from celery.schedules import crontab
+from sqlalchemy import bindparam, case, extract, func, insert, literal, select
 
 from app.core.config import get_settings
+from app.core.database import create_celery_session
+from app.integrations.rusiem.client import RuSIEMClient
+from app.models.models import IncidentStatusChange, PublishedIncident, SlaSnapshot, Tenant
+from app.services.email_service import (
+    new_comment_email,
+    new_incident_email,
+    send_emails_bulk,
+    status_change_email,
+)
+from app.services.log_source_service import LogSourceService
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# Tenants processed at once by the SLA task, each on its own connection
+SLA_CONCURRENCY = 8
+
 celery_app = Celery(
     "mssp_soc",
     broker=settings.CELERY_BROKER_URL,
@@ -52,20 +68,14 @@ def calculate_sla():
 
     Results stored in sla_snapshots table.
     """
-    import asyncio
     asyncio.run(_calculate_sla_async())
 
 
 async def _calculate_sla_async():
-    from sqlalchemy import select
-    from app.core.database import create_celery_session
-    from app.models.models import (
-        Tenant, PublishedIncident, IncidentStatusChange, SlaSnapshot,
-    )
-
     now = datetime.now(timezone.utc)
     period_end = now
     period_start = now - timedelta(hours=24 * 30)  # Last 30 days
+    priorities = ("critical", "high", "medium", "low")
 
     _engine, _session_factory = create_celery_session()
     async with _session_factory() as db:
@@ -75,78 +85,79 @@ async def _calculate_sla_async():
         )
         tenants = result.scalars().all()
 
-        for tenant in tenants:
+    # Tenants are independent: each is measured on its own session, with
+    # concurrency capped (NullPool: one connection per running tenant).
+    # Snapshot rows are collected and written in one INSERT afterwards.
+    sem = asyncio.Semaphore(SLA_CONCURRENCY)
+
+    async def _per_tenant(tenant) -> dict | None:
+        async with sem, _session_factory() as db:
             try:
-                # Get closed incidents in period
-                incidents = await db.execute(
-                    select(PublishedIncident).where(
+                # SLA compliance: % of incidents within SLA targets
+                sla_config = tenant.sla_config or {}
+                sla_targets = sla_config.get("mttr_targets", {
+                    "critical": 240, "high": 1440, "medium": 4320, "low": 10080,
+                })
+
+                # CASE needs at least one WHEN; with no configured targets
+                # every priority falls back to the 7-day default
+                target = (
+                    case(sla_targets, value=PublishedIncident.priority, else_=10080)
+                    if sla_targets else literal(10080)
+                )
+
+                # Per closed incident: minutes to first in_progress and to
+                # close, plus its MTTR target; aggregated below in one query
+                first_ack = (
+                    select(func.min(IncidentStatusChange.created_at))
+                    .where(
+                        IncidentStatusChange.incident_id == PublishedIncident.id,
+                        # Literal, to match the ix_status_changes_in_progress predicate
+                        IncidentStatusChange.new_status == bindparam(
+                            "ack_status", "in_progress", literal_execute=True,
+                        ),
+                    )
+                    .scalar_subquery()
+                )
+                closed = (
+                    select(
+                        PublishedIncident.priority,
+                        (extract("epoch", first_ack - PublishedIncident.published_at) / 60).label("mtta"),
+                        (extract("epoch", PublishedIncident.closed_at - PublishedIncident.published_at) / 60).label("mttr"),
+                        target.label("target"),
+                    )
+                    .where(
                         PublishedIncident.tenant_id == tenant.id,
                         PublishedIncident.published_at >= period_start,
-                        PublishedIncident.status.in_(["closed", "resolved"]),
+                        # Inlined as literals so the planner can match the
+                        # ix_incidents_tenant_closed partial-index predicate
+                        PublishedIncident.status.in_(bindparam(
+                            "closed_statuses", ["closed", "resolved"],
+                            expanding=True, literal_execute=True,
+                        )),
                     )
+                    .subquery()
                 )
-                closed_incidents = incidents.scalars().all()
-
-                if not closed_incidents:
-                    continue
-
-                mtta_values = []
-                mttr_values = []
-
-                for inc in closed_incidents:
-                    # MTTA: time to first in_progress
-                    first_ack = await db.execute(
-                        select(IncidentStatusChange.created_at).where(
-                            IncidentStatusChange.incident_id == inc.id,
-                            IncidentStatusChange.new_status == "in_progress",
-                        ).order_by(IncidentStatusChange.created_at).limit(1)
+                row = (await db.execute(
+                    select(
+                        func.count(),
+                        func.avg(closed.c.mtta),
+                        func.avg(closed.c.mttr),
+                        func.count(closed.c.mttr),
+                        func.count().filter(closed.c.mttr <= closed.c.target),
+                        *(func.count().filter(closed.c.priority == p) for p in priorities),
                     )
-                    ack_time = first_ack.scalar_one_or_none()
-                    if ack_time and inc.published_at:
-                        mtta = (ack_time - inc.published_at).total_seconds() / 60
-                        mtta_values.append(mtta)
-
-                    # MTTR: time to close
-                    if inc.closed_at and inc.published_at:
-                        mttr = (inc.closed_at - inc.published_at).total_seconds() / 60
-                        mttr_values.append(mttr)
+                )).one()
+                total, avg_mtta, avg_mttr, total_with_mttr, compliant = row[:5]
+                by_priority = dict(zip(priorities, row[5:]))
 
-                avg_mtta = sum(mtta_values) / len(mtta_values) if mtta_values else None
-                avg_mttr = sum(mttr_values) / len(mttr_values) if mttr_values else None
-
-                # SLA compliance: % of incidents within SLA targets
-                sla_config = tenant.sla_config or {}
-                sla_targets = sla_config.get("mttr_targets", {
-                    "critical": 240, "high": 1440, "medium": 4320, "low": 10080,
-                })
-                compliant = 0
-                total_with_mttr = 0
-                for inc in closed_incidents:
-                    if inc.closed_at and inc.published_at:
-                        mttr_min = (inc.closed_at - inc.published_at).total_seconds() / 60
-                        target = sla_targets.get(inc.priority, 10080)
-                        total_with_mttr += 1
-                        if mttr_min <= target:
-                            compliant += 1
+                if not total:
+                    return None
 
+                avg_mtta = float(avg_mtta) if avg_mtta is not None else None
+                avg_mttr = float(avg_mttr) if avg_mttr is not None else None
                 compliance = (compliant / total_with_mttr * 100) if total_with_mttr else None
 
-                snapshot = SlaSnapshot(
-                    tenant_id=tenant.id,
-                    period_start=period_start,
-                    period_end=period_end,
-                    mtta_minutes=round(avg_mtta, 1) if avg_mtta else None,
-                    mttr_minutes=round(avg_mttr, 1) if avg_mttr else None,
-                    sla_compliance_pct=round(compliance, 1) if compliance else None,
-                    incidents_total=len(closed_incidents),
-                    incidents_by_priority={
-                        "critical": sum(1 for i in closed_incidents if i.priority == "critical"),
-                        "high": sum(1 for i in closed_incidents if i.priority == "high"),
-                        "medium": sum(1 for i in closed_incidents if i.priority == "medium"),
-                        "low": sum(1 for i in closed_incidents if i.priority == "low"),
-                    },
-                )
-                db.add(snapshot)
                 logger.info(
                     f"SLA snapshot for {tenant.short_name}: "
                     f"MTTA={avg_mtta:.1f}min MTTR={avg_mttr:.1f}min "
@@ -154,11 +165,27 @@ async def _calculate_sla_async():
                     if avg_mtta and avg_mttr and compliance
                     else f"SLA snapshot for {tenant.short_name}: insufficient data"
                 )
-
+                return {
+                    "tenant_id": tenant.id,
+                    "period_start": period_start,
+                    "period_end": period_end,
+                    "mtta_minutes": round(avg_mtta, 1) if avg_mtta else None,
+                    "mttr_minutes": round(avg_mttr, 1) if avg_mttr else None,
+                    "sla_compliance_pct": round(compliance, 1) if compliance else None,
+                    "incidents_total": total,
+                    "incidents_by_priority": by_priority,
+                }
             except Exception as e:
                 logger.error(f"SLA calc failed for tenant {tenant.id}: {e}")
-
-        await db.commit()
+                return None
+
+    snapshots = [
+        row for row in await asyncio.gather(*(_per_tenant(t) for t in tenants)) if row
+    ]
+    if snapshots:
+        async with _session_factory() as db:
+            await db.execute(insert(SlaSnapshot), snapshots)
+            await db.commit()
     await _engine.dispose()
     logger.info("SLA calculation complete")
 
@@ -175,12 +202,10 @@ def send_incident_email(
     portal_url: str = "",
 ):
     """Send new incident email notification."""
-    from app.services.email_service import send_email, new_incident_email
     subject, body = new_incident_email(
         incident_title, rusiem_id, priority, recommendations, portal_url
     )
-    for email in to_emails:
-        send_email(email, subject, body)
+    send_emails_bulk([(email, subject, body) for email in to_emails])
 
 
 @celery_app.task(name="app.tasks.worker.send_status_change_email")
@@ -194,12 +219,10 @@ def send_status_change_email(
     portal_url: str = "",
 ):
     """Send status change email notification."""
-    from app.services.email_service import send_email, status_change_email
     subject, body = status_change_email(
         incident_title, rusiem_id, old_status, new_status, changed_by, portal_url
     )
-    for email in to_emails:
-        send_email(email, subject, body)
+    send_emails_bulk([(email, subject, body) for email in to_emails])
 
 
 @celery_app.task(name="app.tasks.worker.send_comment_email")
@@ -212,12 +235,10 @@ def send_comment_email(
     portal_url: str = "",
 ):
     """Send new comment email notification."""
-    from app.services.email_service import send_email, new_comment_email
     subject, body = new_comment_email(
         incident_title, rusiem_id, comment_by, comment_text, portal_url
     )
-    for email in to_emails:
-        send_email(email, subject, body)
+    send_emails_bulk([(email, subject, body) for email in to_emails])
 
 
 # ── Source status sync task ───────────────────────────────────────
@@ -235,93 +256,60 @@ def sync_source_statuses():
     - degraded: last event 30 min–2 hours ago
     - no_logs:  last event > 2 hours ago or never
     """
-    import asyncio
     asyncio.run(_sync_sources_async())
 
 
 async def _sync_sources_async():
-    from sqlalchemy import select
-    from app.core.database import create_celery_session
-    from app.models.models import Tenant, LogSource
-    from app.services.log_source_service import LogSourceService
-    from app.integrations.rusiem.client import RuSIEMClient
-
-    import redis.asyncio as aioredis
-
     redis_client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+    # All tenants are queried through the same RuSIEM endpoint, so one client
+    # (and its keep-alive connection pool) serves the whole run.
+    rusiem = RuSIEMClient(
+        base_url=settings.RUSIEM_API_URL,
+        api_key=settings.RUSIEM_API_KEY,
+        redis_client=redis_client,
+        verify_ssl=settings.RUSIEM_VERIFY_SSL,
+    )
 
     _engine, _session_factory = create_celery_session()
-    async with _session_factory() as db:
-        # Get all active tenants
-        tenants = (await db.execute(
-            select(Tenant).where(Tenant.is_active == True)  # noqa: E712
-        )).scalars().all()
-
-        for tenant in tenants:
-            try:
-                # Get active sources for this tenant
-                sources = (await db.execute(
-                    select(LogSource).where(
-                        LogSource.tenant_id == tenant.id,
-                        LogSource.is_active == True,  # noqa: E712
+    try:
+        async with _session_factory() as db:
+            # Get all active tenants
+            tenants = (await db.execute(
+                select(Tenant).where(Tenant.is_active == True)  # noqa: E712
+            )).scalars().all()
+            service = LogSourceService(db, redis_client)
+
+            for tenant in tenants:
+                try:
+                    # Get active sources for this tenant
+                    sources = await service.load_hosts(tenant.id)
+
+                    if not sources:
+                        continue
+
+                    source_events = await service.probe_last_events(
+                        rusiem, [source.host for source in sources]
                     )
-                )).scalars().all()
-
-                if not sources:
-                    continue
-
-                rusiem = RuSIEMClient(
-                    base_url=settings.RUSIEM_API_URL,
-                    api_key=settings.RUSIEM_API_KEY,
-                    redis_client=redis_client,
-                    verify_ssl=settings.RUSIEM_VERIFY_SSL,
-                )
 
-                service = LogSourceService(db)
-                source_events = {}
+                    updated = await service.update_statuses_for_tenant(
+                        str(tenant.id), source_events, sources
+                    )
 
-                for source in sources:
-                    try:
-                        events = await rusiem.search_events(
-                            query=f"host:{source.host}",
-                            interval="5m",
-                            limit=1,
+                    if updated >= 0:
+                        logger.info(
+                            f"Source sync {tenant.short_name}: "
+                            f"{len(sources)} checked, {updated} updated, events={source_events}"
                         )
-                        event_data = events.get("data", [])
-                        if event_data:
-                            ts = event_data[0].get("timestamp") or event_data[0].get("@timestamp")
-                            logger.info(f"Source {source.host}: found event, ts={ts}")
-                            if ts:
-                                if isinstance(ts, str):
-                                    last_dt = datetime.fromisoformat(ts.replace("Z", "+00:00"))
-                                else:
-                                    last_dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
-                                source_events[source.host] = last_dt
-                            else:
-                                source_events[source.host] = None
-                        else:
-                            source_events[source.host] = None
-                    except Exception as e:
-                        logger.warning(f"Source check failed for {source.host}: {e}")
-                        source_events[source.host] = None
-
-                updated = await service.update_statuses_for_tenant(
-                    str(tenant.id), source_events
-                )
 
-                await rusiem.close()
+                except Exception as e:
+                    logger.error(f"Source sync failed for tenant {tenant.id}: {e}")
 
-                if updated >= 0:
-                    logger.info(
-                        f"Source sync {tenant.short_name}: "
-                        f"{len(sources)} checked, {updated} updated, events={source_events}"
-                    )
-
-            except Exception as e:
-                logger.error(f"Source sync failed for tenant {tenant.id}: {e}")
+            await db.commit()
+    finally:
+        # The client, Redis and the engine outlive any one tenant; release
+        # them even if the tenant query or the final commit fails.
+        await rusiem.close()
+        await redis_client.close()
+        await _engine.dispose()
 
-        await db.commit()
-
-    await redis_client.close()
-    await _engine.dispose()
     logger.info("Source status sync complete")
@@ -0,0 +1,12 @@
+import pytest_asyncio
+from httpx import AsyncClient, ASGITransport
+
+from app.main import app
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def client():
+    """One ASGI client shared by the whole test session."""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
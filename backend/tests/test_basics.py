@@ -3,19 +3,15 @@ Basic tests to verify the application bootstraps correctly.
 """
 
 import pytest
-from httpx import AsyncClient, ASGITransport
 
-from app.main import app
 from app.core.security import hash_password, verify_password, create_access_token, decode_token
 
 
 # ── App health ────────────────────────────────────────────────────
 
-@pytest.mark.asyncio
-async def test_health_endpoint():
-    transport = ASGITransport(app=app)
-    async with AsyncClient(transport=transport, base_url="http://test") as client:
-        resp = await client.get("/health")
+@pytest.mark.asyncio(loop_scope="session")
+async def test_health_endpoint(client):
+    resp = await client.get("/health")
     assert resp.status_code == 200
     data = resp.json()
     assert data["status"] == "ok"
@@ -31,6 +27,16 @@ def test_password_hash_and_verify():
     assert not verify_password("wrong_password", hashed)
 
 
+@pytest.mark.asyncio
+async def test_password_hash_async_matches_sync():
+    from app.core.security import hash_password_async, verify_password_async
+
+    hashed = await hash_password_async("test_password_12345")
+    assert verify_password("test_password_12345", hashed)
+    assert await verify_password_async("test_password_12345", hashed)
+    assert not await verify_password_async("wrong_password", hashed)
+
+
 def test_jwt_create_and_decode():
     payload = {"sub": "user-123", "role": "soc_admin", "email": "test@test.com"}
     token = create_access_token(payload)
@@ -53,6 +59,28 @@ def test_models_import():
     assert IncidentComment.__tablename__ == "incident_comments"
 
 
+def test_after_commit_callbacks_skip_rollback():
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    from app.core.database import after_commit
+
+    calls = []
+    with Session(create_engine("sqlite://")) as session:
+        session.connection()
+        after_commit(session, lambda: calls.append("rolled back"))
+        session.rollback()
+        after_commit(session, lambda: calls.append("committed"))
+        session.commit()
+
+        async def audit():
+            calls.append("audited")
+
+        session.connection()
+        after_commit(session, audit)
+        session.commit()
+    assert calls == ["committed", "audited"]
+
+
 # ── Incident status transitions ───────────────────────────────────
 
 def test_client_status_transitions():
@@ -69,6 +97,51 @@ def test_soc_status_transitions():
     assert "awaiting_customer" in SOC_TRANSITIONS["in_progress"]
 
 
+# ── Log source status ────────────────────────────────────────────
+
+def test_log_source_status_thresholds():
+    from datetime import datetime, timedelta, timezone
+    from app.services.log_source_service import LogSourceService
+
+    now = datetime.now(timezone.utc)
+    active_since, degraded_since = now - timedelta(minutes=30), now - timedelta(hours=2)
+    status = LogSourceService._compute_status
+    assert status(now - timedelta(minutes=5), active_since, degraded_since) == "active"
+    assert status(now - timedelta(hours=1), active_since, degraded_since) == "degraded"
+    assert status(now - timedelta(hours=3), active_since, degraded_since) == "no_logs"
+    naive = (now - timedelta(minutes=5)).replace(tzinfo=None)
+    assert status(naive, active_since, degraded_since) == "active"
+
+
+@pytest.mark.asyncio
+async def test_log_source_update_rejects_taken_host():
+    import uuid
+    from types import SimpleNamespace
+    from app.services.log_source_service import LogSourceService, LogSourceServiceError
+
+    source = SimpleNamespace(
+        id=uuid.uuid4(), tenant_id=uuid.uuid4(), host="10.0.0.1", is_active=True,
+    )
+
+    class FakeDB:
+        flushed = False
+
+        async def get(self, model, ident):
+            return source
+
+        async def scalar(self, stmt):
+            return uuid.uuid4()  # another active source already has the host
+
+        async def flush(self):
+            self.flushed = True
+
+    db = FakeDB()
+    with pytest.raises(LogSourceServiceError) as exc:
+        await LogSourceService(db).update_source(str(source.id), host="10.0.0.2")
+    assert exc.value.status_code == 409
+    assert source.host == "10.0.0.1" and not db.flushed
+
+
 # ── RuSIEM client mapping ────────────────────────────────────────
 
 def test_rusiem_priority_mapping():
@@ -95,3 +168,160 @@ def test_rusiem_preview_mapping():
     assert "dc01.corp.local" in preview["source_hostnames"]
     assert "192.168.1.1" in preview["event_source_ips"]
     assert "Brute Force" in preview["symptoms"]
+
+
+# ── Email ────────────────────────────────────────────────────────
+
+def test_smtp_session_reuses_connection(monkeypatch):
+    from app.services import email_service
+
+    connections = []
+
+    class FakeSMTP:
+        def __init__(self, host, port, timeout=None):
+            self.sent = []
+            self.parts = []
+            connections.append(self)
+
+        def login(self, user, password):
+            pass
+
+        def noop(self):
+            return 250, b"OK"
+
+        def has_extn(self, name):
+            return name == "8bitmime"
+
+        def send_message(self, msg, mail_options=()):
+            assert "BODY=8BITMIME" in mail_options
+            assert msg.get_payload(0)["Content-Transfer-Encoding"] == "8bit"
+            self.sent.append(msg["To"])
+            self.parts.append(msg.get_payload(0))
+
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(email_service.smtplib, "SMTP_SSL", FakeSMTP)
+    monkeypatch.setattr(email_service, "_smtp", email_service._Smtp(
+        host="smtp.example.com", port=465, user="user", password="secret",
+        tls=True, sender="SOC <soc@example.com>",
+    ))
+
+    sent = email_service.send_emails_bulk([
+        ("a@example.com", "s", "<p>один</p>"),
+        ("b@example.com", "s", "<p>два</p>"),
+        ("c@example.com", "s", "<p>два</p>"),
+    ])
+    assert sent == 3
+    assert len(connections) == 1
+    assert connections[0].sent == ["a@example.com", "b@example.com", "c@example.com"]
+    parts = connections[0].parts
+    assert parts[1] is parts[2] and parts[0] is not parts[1]
+
+
+def test_smtp_session_encodes_long_lines(monkeypatch):
+    from app.services import email_service
+
+    sent = []
+
+    class FakeSMTP:
+        def __init__(self, host, port, timeout=None):
+            pass
+
+        def login(self, user, password):
+            pass
+
+        def has_extn(self, name):
+            return name == "8bitmime"
+
+        def send_message(self, msg, mail_options=()):
+            sent.append((msg.get_payload(0), mail_options))
+
+        def quit(self):
+            pass
+
+    monkeypatch.setattr(email_service.smtplib, "SMTP_SSL", FakeSMTP)
+    monkeypatch.setattr(email_service, "_smtp", email_service._Smtp(
+        host="smtp.example.com", port=465, user="user", password="secret",
+        tls=True, sender="SOC <soc@example.com>",
+    ))
+
+    subject, body = email_service.new_incident_email("T", 1, "high", "Рекомендуется " * 80, "")
+    assert not email_service._fits_8bit(body)
+    assert email_service.send_emails_bulk([("a@example.com", subject, body)]) == 1
+    part, mail_options = sent[0]
+    assert part["Content-Transfer-Encoding"] == "base64"
+    assert "BODY=8BITMIME" not in mail_options
+    assert max(map(len, part.as_bytes().splitlines())) <= email_service.SMTP_MAX_LINE
+
+
+def test_email_templates_escape_user_text():
+    from app.services.email_service import new_comment_email
+    subject, html = new_comment_email("Title", 7, "Analyst", "<script>x</script>")
+    assert subject == "[SOC] Новый комментарий #7"
+    assert "&lt;script&gt;" in html
+    assert "<script>" not in html
+    assert "MSSP SOC Portal" in html
+
+
+# ── Reports ──────────────────────────────────────────────────────
+
+def test_incident_report_escapes_user_text():
+    from datetime import datetime, timezone
+    from types import SimpleNamespace
+    from app.services.report_service import ReportService
+
+    incident = SimpleNamespace(
+        rusiem_incident_id=7, title="<b>Title</b>", priority="high", status="new",
+        category="malware", event_count=3, source_ips=["10.0.0.1"],
+        published_at=datetime.now(timezone.utc),
+        description=None, recommendations="<script>x</script>", soc_actions=None,
+    )
+    comment = SimpleNamespace(is_soc=True, created_at=None, text="<img src=x>")
+    html = ReportService(None)._render_incident_html(None, incident, [comment], [])
+    assert "<script>" not in html and "<img" not in html
+    assert "&lt;script&gt;" in html
+    assert "10.0.0.1" in html
+
+
+def test_sla_report_escapes_user_text():
+    from datetime import datetime, timezone
+    from types import SimpleNamespace
+    from app.services.report_service import ReportService
+
+    now = datetime.now(timezone.utc)
+    incident = SimpleNamespace(
+        rusiem_incident_id=7, title="<script>x</script>", priority="high",
+        status="in_progress", published_at=now, closed_at=None, mttr=None,
+    )
+    html = ReportService(None)._render_sla_html(
+        SimpleNamespace(name="A & B"), [incident], 1, {}, {"high": 1440},
+        None, None, now, now, {},
+    )
+    assert "<script>" not in html and "&lt;script&gt;" in html
+    assert "A &amp; B" in html
+    assert "В работе" in html
+
+
+def test_parse_period_covers_whole_days():
+    from app.services.report_service import ReportServiceError, parse_period
+
+    dt_from, dt_to = parse_period("2024-03-01", "2024-03-31")
+    assert (dt_from.hour, dt_to.hour, dt_to.minute) == (0, 23, 59)
+    assert dt_from.tzinfo is not None and dt_to.day == 31
+    with pytest.raises(ReportServiceError):
+        parse_period("01.03.2024", "2024-03-31")
+
+
+# ── Celery tasks ─────────────────────────────────────────────────
+
+def test_beat_schedule_tasks_registered():
+    from app.tasks.worker import celery_app
+
+    registered = {
+        name for name, task in celery_app.tasks.items()
+        if task.__module__ == "app.tasks.worker"
+    }
+    scheduled = {entry["task"] for entry in celery_app.conf.beat_schedule.values()}
+    assert scheduled <= registered
+    assert all(name.startswith("app.tasks.worker.") for name in registered)